@@ -1,19 +1,27 @@
 import sys
-import requests
 import webbrowser
 import random
-import urllib.parse
-import re
+import time
+import threading
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QLabel, QLineEdit, QPushButton, QListWidget, QStackedWidget, 
+                             QLabel, QLineEdit, QPushButton, QListView, QStackedWidget, 
                              QProgressBar, QMessageBox, QSizeGrip, QSizePolicy, QDialog, QFrame)
-from PyQt5.QtCore import Qt, QPropertyAnimation, QEasingCurve, QTimer, QSize, QPoint
+from PyQt5.QtCore import Qt, QPropertyAnimation, QEasingCurve, QTimer, QSize, QPoint, QThread, pyqtSignal
 from PyQt5.QtGui import QFont, QColor, QPalette, QPixmap, QIcon, QMouseEvent, QImage, QPainter
 from bs4 import BeautifulSoup
-from io import BytesIO
+from feather_sources import (read_urls, fetch_all_sources, load_cached_sources, merge_results,
+                             fall_back_to_cache, failure_summary, refresh_changes, SourceHealth,
+                             LOAD_DEADLINE, PARSE_PROCESSES)
+from feather_catalog import Catalog
+from feather_search import SubstringIndex
+from feather_query import exact_matches, closest_matches, QuerySyntaxError, QUERY_HELP
+from feather_qt import LiveSearch, GameListModel, PixmapCache, ListControls
+from feather_cache import SourceCache, CoverCache, COVER_CACHE_BYTES
+from feather_covers import CoverLoader
+from feather_snapshot import load_snapshot, save_snapshot, source_hashes, result_hashes
 
 class ImageDialog(QDialog):
-    def __init__(self, image_url, parent=None):
+    def __init__(self, image_url, cover_loader, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Game Cover Art")
         self.setWindowFlags(Qt.Window | Qt.WindowFullscreenButtonHint)
@@ -46,7 +54,8 @@ class ImageDialog(QDialog):
         self.box_frame.setMinimumSize(400, 400)
         
         # Image label inside the box
-        self.image_label = QLabel()
+        self.image_label = QLabel("Loading image...")
+        self.image_label.setStyleSheet("color: #aaaaaa;")
         self.image_label.setAlignment(Qt.AlignCenter)
         
         # Layout for the box frame
@@ -73,56 +82,48 @@ class ImageDialog(QDialog):
         close_btn.clicked.connect(self.close)
         layout.addWidget(close_btn, alignment=Qt.AlignCenter)
         
-        # Load the image
+        # Load the image; the cover loader reads and scales it off the GUI thread
+        self.image_url = image_url
+        self.cover_loader = cover_loader
+        self.cover_loader.full_image_ready.connect(self.on_image_loaded)
         self.load_image(image_url)
 
     def load_image(self, image_url):
+        # Scale the image to be as large as possible while fitting within the screen
+        screen_size = QApplication.primaryScreen().availableGeometry()
+        max_width = int(screen_size.width() * 0.8)  # 80% of screen width
+        max_height = int(screen_size.height() * 0.7)  # 70% of screen height
+        self.cover_loader.request_full(image_url, max_width, max_height)
+
+    def on_image_loaded(self, image_url, image, error):
+        if image_url != self.image_url:
+            return
+        if image is None:
+            self.image_label.clear()
+            self.show_error(error)
+            return
+        
+        # Set the image
+        self.image_label.setPixmap(QPixmap.fromImage(image))
+        
+        # Adjust dialog size to fit content
+        self.adjustSize()
+        
+        # Center the dialog on screen
+        screen_size = QApplication.primaryScreen().availableGeometry()
+        self.move(
+            screen_size.center() - self.rect().center()
+        )
+        
+        self.current_image_url = image_url
+
+    def done(self, result):
+        # The loader outlives the dialog; stop listening before going away
         try:
-            # Fix URLs that start with //
-            if image_url.startswith('//'):
-                image_url = 'https:' + image_url
-            
-            response = requests.get(image_url, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }, timeout=10)
-            
-            image_data = BytesIO(response.content)
-            pixmap = QPixmap()
-            pixmap.loadFromData(image_data.read())
-            
-            if not pixmap.isNull():
-                # Get screen dimensions
-                screen = QApplication.primaryScreen()
-                screen_size = screen.availableGeometry()
-                
-                # Calculate maximum size while maintaining aspect ratio
-                max_width = screen_size.width() * 0.8  # 80% of screen width
-                max_height = screen_size.height() * 0.7  # 70% of screen height
-                
-                # Scale the image to be as large as possible while fitting within screen
-                scaled_pixmap = pixmap.scaled(
-                    max_width, 
-                    max_height,
-                    Qt.KeepAspectRatio,
-                    Qt.SmoothTransformation
-                )
-                
-                # Set the image
-                self.image_label.setPixmap(scaled_pixmap)
-                
-                # Adjust dialog size to fit content
-                self.adjustSize()
-                
-                # Center the dialog on screen
-                self.move(
-                    screen_size.center() - self.rect().center()
-                )
-                
-                self.current_image_url = image_url
-            else:
-                self.show_error("Failed to load image")
-        except Exception as e:
-            self.show_error(f"Failed to fetch image: {str(e)}")
+            self.cover_loader.full_image_ready.disconnect(self.on_image_loaded)
+        except TypeError:
+            pass  # Already disconnected by an earlier close
+        super().done(result)
 
     def show_error(self, message):
         error_label = QLabel(message)
@@ -256,6 +257,112 @@ class AnimatedButton(QPushButton):
             }
         """)
 
+def build_search_index(catalog):
+    """Index the normalized clean name of every entry, as computed when the catalog was built"""
+    return SubstringIndex(catalog.name_keys, catalog.tokens)
+
+class CatalogLoader(QThread):
+    """Fetches every source off the GUI thread, reporting progress as data arrives"""
+    progress = pyqtSignal('qlonglong', int, int, int)  # bytes, entries, sources done, sources total
+    partial = pyqtSignal(object, object)  # catalog and search index of the sources loaded so far
+    loaded = pyqtSignal(object, object, str, bool)  # catalog, search index, failure summary, changed
+    patched = pyqtSignal(object, object, str)  # CatalogDelta for the base catalog, source hashes, failure summary
+    
+    # Minimum seconds between two progress updates
+    PROGRESS_INTERVAL = 0.1
+    
+    def __init__(self, urls, refresh=False, deadline=LOAD_DEADLINE, base=None, parent=None):
+        super().__init__(parent)
+        self.urls = urls
+        self.deadline = deadline
+        # A refresh revalidates a catalog that is already on screen: no partial results
+        self.refresh = refresh
+        # (catalog, {url: body hash}) on screen; a refresh then only reports what changed in it
+        self.base = base
+        self.cancel_event = threading.Event()
+        self.lock = threading.Lock()
+        self.byte_count = 0
+        self.entry_count = 0
+        self.sources_done = 0
+        self.last_report = 0.0
+    
+    def cancel(self):
+        self.cancel_event.set()
+    
+    def count_bytes(self, url, count):
+        with self.lock:
+            self.byte_count += count
+        self.report()
+    
+    def count_entries(self, url, count):
+        with self.lock:
+            self.entry_count += count
+        self.report()
+    
+    def report(self, force=False):
+        # Called from the download threads; throttled so the GUI is not flooded
+        now = time.monotonic()
+        with self.lock:
+            if not force and now - self.last_report < self.PROGRESS_INTERVAL:
+                return
+            self.last_report = now
+            counts = (self.byte_count, self.entry_count, self.sources_done, len(self.urls))
+        self.progress.emit(*counts)
+    
+    def run(self):
+        cache = SourceCache()
+        # Sources are appended here as they complete, so the GUI can show them early;
+        # releases listed by several sources are merged once every source is in
+        partial_catalog = Catalog()
+        partial_index = SubstringIndex()
+        arrival = []
+        
+        def source_done(position, result):
+            with self.lock:
+                self.sources_done += 1
+            self.report(force=True)
+            if self.refresh or not result.ok or self.cancel_event.is_set():
+                return
+            # Catalog first: the index must never hold ids the catalog does not have yet
+            partial_catalog.merge(result.catalog)
+            for key, tokens in zip(result.catalog.name_keys, result.catalog.tokens):
+                partial_index.add(key, tokens)
+            arrival.append(position)
+            self.partial.emit(partial_catalog, partial_index)
+        
+        base_catalog, base_hashes = self.base or (None, None)
+        results = fetch_all_sources(self.urls, timeout=10, cache=cache,
+                                    on_entries=self.count_entries, on_bytes=self.count_bytes,
+                                    on_result=source_done, cancel=self.cancel_event,
+                                    health=SourceHealth(), deadline=self.deadline,
+                                    processes=PARSE_PROCESSES, known=base_hashes)
+        summary = failure_summary(results) or ""
+        if base_catalog is not None:
+            # Changes are applied to what is on screen, in time proportional to how many there are
+            delta, hashes = refresh_changes(base_catalog, base_hashes, results, cache)
+            if delta is not None:
+                self.patched.emit(delta, hashes, summary)
+                return
+        changed = not self.refresh or any(result.ok and not result.from_cache for result in results)
+        # Keep serving the last good copy of a source that is unreachable right now
+        loaded = fall_back_to_cache(results, cache)
+        
+        if not changed:
+            self.loaded.emit(None, None, summary, False)
+            return
+        if not self.refresh and arrival == [position for position, result in enumerate(loaded) if result]:
+            # Sources happened to finish in urls.txt order with nothing to fill in, so
+            # what is shown is final unless several sources list the same release
+            catalog = partial_catalog.deduplicate()
+            search_index = partial_index if catalog is partial_catalog else build_search_index(catalog)
+        else:
+            # Final order is urls.txt order; index here so the GUI thread only swaps references
+            catalog = merge_results(loaded)
+            search_index = build_search_index(catalog)
+        self.loaded.emit(catalog, search_index, summary, True)
+        # Next start can map this instead of parsing the cached sources again
+        save_snapshot(self.urls, result_hashes(loaded), catalog, search_index)
+
 class GameDownloaderApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -301,21 +408,29 @@ class GameDownloaderApp(QMainWindow):
                 padding: 8px;
                 font-size: 14px;
             }
-            QListWidget {
+            QComboBox {
+                background-color: #111111;
+                color: #ffffff;
+                border: 1px solid #333333;
+                border-radius: 5px;
+                padding: 5px 8px;
+                font-size: 13px;
+            }
+            QListView {
                 background-color: #111111;
                 color: #ffffff;
                 border: 1px solid #333333;
                 border-radius: 5px;
                 font-size: 14px;
             }
-            QListWidget::item {
+            QListView::item {
                 padding: 10px;
                 border-bottom: 1px solid #333333;
             }
-            QListWidget::item:hover {
+            QListView::item:hover {
                 background-color: #222222;
             }
-            QListWidget::item:selected {
+            QListView::item:selected {
                 background-color: #333333;
             }
             QProgressBar {
@@ -340,37 +455,83 @@ class GameDownloaderApp(QMainWindow):
         self.stacked_widget = QStackedWidget()
         self.content_layout.addWidget(self.stacked_widget)
         
+        # Loading status, shown below the pages while sources are still arriving
+        self.load_status = QWidget()
+        status_layout = QHBoxLayout(self.load_status)
+        status_layout.setContentsMargins(0, 0, 0, 0)
+        self.load_status_label = QLabel()
+        self.load_status_label.setStyleSheet("font-size: 13px; color: #aaaaaa;")
+        status_layout.addWidget(self.load_status_label, stretch=1)
+        self.status_cancel_btn = AnimatedButton("Cancel")
+        self.status_cancel_btn.clicked.connect(self.cancel_loading)
+        status_layout.addWidget(self.status_cancel_btn)
+        # Sources that failed are summarised here afterwards instead of in a dialog
+        self.status_dismiss_btn = AnimatedButton("Dismiss")
+        self.status_dismiss_btn.clicked.connect(self.load_status.hide)
+        self.status_dismiss_btn.hide()
+        status_layout.addWidget(self.status_dismiss_btn)
+        self.load_status.hide()
+        self.content_layout.addWidget(self.load_status)
+        
         # Add content widget to main layout
         self.main_layout.addWidget(self.content_widget)
         
         # Create pages
         self.create_loading_page()
         self.create_main_page()
-        self.create_search_page()
         self.create_results_page()
         
         # Start with loading page
-        self.stacked_widget.setCurrentIndex(0)
+        self.stacked_widget.setCurrentWidget(self.loading_page)
         
         # Game data
-        self.combined_downloads = []
-        self.current_games_list = []
+        self.catalog = Catalog()
+        self.search_index = SubstringIndex()
+        self.current_games_list = []  # catalog indices listed for the current query, best first
+        self.shown_games = []  # the same after sorting and filtering, as shown in games_list row by row
         self.data_loaded = False
-        self.current_selected_game = None
+        self.current_selected_game = None  # catalog index
         self.current_image_url = None
-        self.image_cache = {}
+        # Preview-sized covers only, clean title -> (pixmap, image URL); the viewer loads full size
+        self.image_cache = PixmapCache()
+        self.current_cover_title = None  # clean title the preview should show
+        self.current_query = None  # None while showing all games
+        self.current_query_fuzzy = False
+        self.new_games = []  # catalog indices of releases a refresh found that the last run did not list
+        self.showing_new_games = False
+        self.loader = None
+        
+        # Show the last known catalog immediately and refresh it in the background
+        self.stale_while_revalidate = True
         
         # SteamGridDB API key
         self.steamgrid_api_key = "STEAMGRIDDAPI"
         
-        # Load data after a short delay to show loading animation
-        QTimer.singleShot(1500, self.load_data)
-    
-    def extract_clean_game_name(self, full_title):
-        """Extract just the game name from complex titles"""
-        # Remove everything after the first bracket or parenthesis
-        clean_name = re.split(r'[\[\(\|]', full_title)[0].strip()
-        return clean_name
+        # Disk space kept for downloaded covers; least recently viewed ones go first
+        self.cover_cache_bytes = COVER_CACHE_BYTES
+        
+        # Covers are looked up off the GUI thread; only the current selection's is shown
+        self.cover_loader = CoverLoader(self.steamgrid_api_key, self,
+                                        cache=CoverCache(max_bytes=self.cover_cache_bytes))
+        self.cover_loader.cover_ready.connect(self.on_cover_ready)
+        self.cover_loader.cover_failed.connect(self.on_cover_failed)
+        
+        # Covers of the rows on screen and next to the selection are fetched ahead of time
+        self.prefetch_neighbours = 3
+        # Seconds a title whose cover just failed to load is left out of prefetches
+        self.cover_retry_delay = 5 * 60
+        self.failed_covers = {}  # clean title -> time.monotonic() of its last failed lookup
+        self.prefetch_timer = QTimer(self)
+        self.prefetch_timer.setSingleShot(True)
+        self.prefetch_timer.setInterval(150)
+        self.prefetch_timer.timeout.connect(self.prefetch_covers)
+        self.games_list.verticalScrollBar().valueChanged.connect(lambda: self.prefetch_timer.start())
+        
+        if self.stale_while_revalidate and self.load_cached_data():
+            return
+        
+        # Start once the event loop runs; the download itself happens on a worker thread
+        QTimer.singleShot(0, self.load_data)
     
     def create_loading_page(self):
         self.loading_page = QWidget()
@@ -383,11 +544,15 @@ class GameDownloaderApp(QMainWindow):
         self.loading_label.setAlignment(Qt.AlignCenter)
         
         self.progress_bar = QProgressBar()
-        self.progress_bar.setRange(0, 0)  # Indeterminate mode
+        self.progress_bar.setRange(0, 0)  # Indeterminate until the source count is known
         self.progress_bar.setFixedWidth(300)
         
+        self.loading_cancel_btn = AnimatedButton("Cancel")
+        self.loading_cancel_btn.clicked.connect(self.cancel_loading)
+        
         layout.addWidget(self.loading_label)
         layout.addWidget(self.progress_bar)
+        layout.addWidget(self.loading_cancel_btn, alignment=Qt.AlignCenter)
         
         self.stacked_widget.addWidget(self.loading_page)
     
@@ -455,6 +620,14 @@ class GameDownloaderApp(QMainWindow):
         self.surprise_btn.clicked.connect(self.surprise_me)
         button_layout.addWidget(self.surprise_btn)
         
+        # New Since Last Run button, shown once a refresh has found new releases
+        self.new_games_btn = AnimatedButton("New Since Last Run")
+        self.new_games_btn.setIcon(QIcon.fromTheme("emblem-new"))
+        self.new_games_btn.setIconSize(QSize(20, 20))
+        self.new_games_btn.clicked.connect(self.show_new_games)
+        self.new_games_btn.hide()
+        button_layout.addWidget(self.new_games_btn)
+        
         layout.addWidget(button_container, alignment=Qt.AlignCenter)
         
         # Add some vertical spacing at the bottom
@@ -462,32 +635,6 @@ class GameDownloaderApp(QMainWindow):
         
         self.stacked_widget.addWidget(self.main_page)
     
-    def create_search_page(self):
-        self.search_page = QWidget()
-        layout = QVBoxLayout(self.search_page)
-        layout.setSpacing(20)
-        
-        # Back button
-        back_btn = AnimatedButton("Back")
-        back_btn.clicked.connect(self.show_main_page)
-        layout.addWidget(back_btn, alignment=Qt.AlignLeft)
-        
-        # Search field
-        search_label = QLabel("Search for a game:")
-        layout.addWidget(search_label)
-        
-        self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText("Enter game title...")
-        self.search_input.returnPressed.connect(self.perform_search)
-        layout.addWidget(self.search_input)
-        
-        # Search button
-        self.search_submit_btn = AnimatedButton("Search")
-        self.search_submit_btn.clicked.connect(self.perform_search)
-        layout.addWidget(self.search_submit_btn, alignment=Qt.AlignCenter)
-        
-        self.stacked_widget.addWidget(self.search_page)
-    
     def create_results_page(self):
         self.results_page = QWidget()
         layout = QHBoxLayout(self.results_page)
@@ -500,18 +647,36 @@ class GameDownloaderApp(QMainWindow):
         
         # Back button
         back_btn = AnimatedButton("Back")
-        back_btn.clicked.connect(self.show_previous_page)
+        back_btn.clicked.connect(self.show_main_page)
         left_layout.addWidget(back_btn, alignment=Qt.AlignLeft)
         
+        # Search field, filtering the list while typing
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search for a game, e.g. witcher size:<30GB date:>2024")
+        self.search_input.setToolTip(QUERY_HELP)
+        left_layout.addWidget(self.search_input)
+        
+        self.live_search = LiveSearch(self.search_input)
+        self.live_search.results_ready.connect(self.show_search_results)
+        
+        # Sort order and size limit, answered from the catalog's sorted indexes
+        self.list_controls = ListControls()
+        self.list_controls.changed.connect(lambda: self.display_games(self.results_label.text()))
+        left_layout.addWidget(self.list_controls)
+        
         # Results label
         self.results_label = QLabel()
         self.results_label.setStyleSheet("font-size: 18px; color: #ffffff;")
         self.results_label.setAlignment(Qt.AlignCenter)
         left_layout.addWidget(self.results_label)
         
-        # Games list
-        self.games_list = QListWidget()
-        self.games_list.itemClicked.connect(self.on_game_selected)
+        # Games list; rows are drawn straight from the catalog, only when visible
+        self.games_model = GameListModel(self)
+        self.games_list = QListView()
+        self.games_list.setModel(self.games_model)
+        self.games_list.setUniformItemSizes(True)
+        # Follows the current row, so arrow-key browsing updates the cover too
+        self.games_list.selectionModel().currentChanged.connect(self.on_game_selected)
         left_layout.addWidget(self.games_list)
         
         # Button container
@@ -565,7 +730,7 @@ class GameDownloaderApp(QMainWindow):
     
     def show_fullscreen_image(self, event):
         if hasattr(self, 'current_image_url') and self.current_image_url:
-            image_dialog = ImageDialog(self.current_image_url, self)
+            image_dialog = ImageDialog(self.current_image_url, self.cover_loader, self)
             image_dialog.exec_()
     
     def load_data(self):
@@ -576,167 +741,331 @@ class GameDownloaderApp(QMainWindow):
         urls_file = "urls.txt"
         
         try:
-            with open(urls_file, 'r') as file:
-                urls = [line.strip() for line in file.readlines() if line.strip()]
+            urls = read_urls(urls_file)
         except FileNotFoundError:
             self.show_error(f"File {urls_file} not found. Please ensure the file exists.")
             return
         
-        self.combined_downloads = []
-        
-        for url in urls:
-            try:
-                response = requests.get(url, timeout=10)
-                if response.status_code == 200:
-                    data = response.json()
-                    downloads = data.get("downloads", [])
-                    self.combined_downloads.extend(downloads)
-                else:
-                    self.show_warning(f"Failed to fetch data from {url}. Status code: {response.status_code}")
-            except requests.exceptions.RequestException as e:
-                self.show_warning(f"Error fetching data from {url}: {e}")
-        
+        # All sources are fetched in parallel; each one is shown as soon as it completes
+        self.start_loader(urls)
+    
+    def load_cached_data(self):
+        """Show the catalog from disk right away, then revalidate it off the GUI thread"""
+        try:
+            urls = read_urls("urls.txt")
+        except FileNotFoundError:
+            return False
+        
+        # The snapshot of the last load, as long as no cached source has changed since
+        cache = SourceCache()
+        hashes = source_hashes(urls, cache)
+        snapshot = load_snapshot(urls, hashes)
+        if snapshot is not None:
+            catalog, search_index = snapshot
+            if search_index is None:
+                search_index = build_search_index(catalog)
+        else:
+            cached = load_cached_sources(urls, cache, PARSE_PROCESSES)
+            if not cached:
+                return False
+            catalog = merge_results(cached)
+            search_index = build_search_index(catalog)
+            threading.Thread(target=save_snapshot, args=(urls, hashes, catalog, search_index)).start()
+        
+        self.set_catalog(catalog, search_index)
         self.data_loaded = True
         self.show_main_page()
+        
+        self.start_loader(urls, refresh=True, base=(catalog, dict(zip(urls, hashes))))
+        return True
+    
+    def start_loader(self, urls, refresh=False, base=None):
+        # A refresh runs behind a catalog already on screen, so nothing is waiting on a slow source
+        deadline = None if refresh else LOAD_DEADLINE
+        self.loader = CatalogLoader(urls, refresh, deadline=deadline, base=base, parent=self)
+        if not refresh:
+            self.status_cancel_btn.show()
+            self.status_dismiss_btn.hide()
+            self.load_status_label.setToolTip("")
+            self.loader.progress.connect(self.update_progress)
+            self.loader.partial.connect(self.show_partial_data)
+        self.loader.loaded.connect(self.finish_loading)
+        self.loader.patched.connect(self.apply_changes)
+        self.loader.start()
+    
+    def update_progress(self, byte_count, entry_count, sources_done, sources_total):
+        self.progress_bar.setRange(0, sources_total)
+        self.progress_bar.setValue(sources_done)
+        text = (f"Loaded {sources_done} of {sources_total} sources · "
+                f"{entry_count:,} entries · {byte_count / (1024 * 1024):.1f} MB")
+        self.loading_label.setText(text)
+        self.load_status_label.setText(text)
+    
+    def show_partial_data(self, catalog, search_index):
+        """Show the sources that have arrived so far while the rest keep loading"""
+        old_catalog = self.catalog
+        self.set_catalog(catalog, search_index)
+        current_page = self.stacked_widget.currentWidget()
+        if current_page is self.loading_page:
+            self.show_main_page()
+            self.load_status.show()
+        elif current_page is self.results_page:
+            self.refresh_results_view(old_catalog)
+    
+    def cancel_loading(self):
+        if self.loader and self.loader.isRunning():
+            self.loader.cancel()
+            self.loading_cancel_btn.setEnabled(False)
+            self.status_cancel_btn.setEnabled(False)
+            self.load_status_label.setText("Cancelling...")
+    
+    def finish_loading(self, catalog, search_index, summary, changed):
+        refresh = self.loader.refresh
+        self.loader = None
+        if summary:
+            print(summary)
+        if not refresh:
+            self.data_loaded = True
+        if summary:
+            self.show_load_summary(summary)
+        elif not refresh:
+            self.load_status.hide()
+        if not changed:
+            return
+        
+        old_catalog = self.catalog
+        self.set_catalog(catalog, search_index)
+        if refresh:
+            # Rebuilt rather than patched: compare by the identity selections are kept by
+            listed = {old_catalog.key(index) for index in old_catalog.live()}
+            self.new_games = [index for index in range(len(catalog)) if catalog.key(index) not in listed]
+            self.update_new_games_button()
+        current_page = self.stacked_widget.currentWidget()
+        if current_page is self.results_page:
+            self.refresh_results_view(old_catalog)
+        else:
+            self.current_selected_game = None
+            if current_page is self.loading_page:
+                self.show_main_page()
+    
+    def apply_changes(self, delta, hashes, summary):
+        """Patch the catalog on screen with what a refresh found changed, leaving the rest untouched"""
+        base_hashes = self.loader.base[1]
+        self.loader = None
+        if summary:
+            print(summary)
+            self.show_load_summary(summary)
+        if delta:
+            # Catalog first: the index must never hold ids the catalog does not have yet
+            appended = self.catalog.apply(delta)
+            for index in appended:
+                self.search_index.add(self.catalog.name_keys[index], self.catalog.tokens[index])
+            self.new_games.extend(appended[position] for position in delta.new)
+            self.live_search.set_index(self.search_index, self.catalog)
+            self.update_new_games_button()
+            if self.stacked_widget.currentWidget() is self.results_page:
+                self.current_games_list = self.current_listing()
+                self.shown_games = self.list_controls.arrange(self.catalog, self.current_games_list)
+                self.games_model.update_rows(self.shown_games)
+                if self.current_selected_game in self.catalog.retired:
+                    self.current_selected_game = None
+        if delta or hashes != base_hashes:
+            threading.Thread(target=save_snapshot, args=(list(hashes), list(hashes.values()),
+                                                         self.catalog, self.search_index)).start()
+    
+    def show_load_summary(self, summary):
+        """Leave a load's outcome in the status area: the first line shown, the full list on hover"""
+        self.load_status_label.setText(summary.splitlines()[0] + " (hover for details)")
+        self.load_status_label.setToolTip(summary)
+        self.status_cancel_btn.hide()
+        self.status_dismiss_btn.show()
+        self.load_status.show()
+    
+    def update_new_games_button(self):
+        count = len(self.catalog.live(self.new_games))
+        self.new_games_btn.setText(f"New Since Last Run ({count})")
+        self.new_games_btn.setVisible(count > 0)
+    
+    def set_catalog(self, catalog, search_index):
+        self.catalog = catalog
+        self.search_index = search_index
+        self.live_search.set_index(search_index, catalog)
+    
+    def refresh_results_view(self, old_catalog):
+        """Re-run the visible listing on new data, keeping scroll position and selection"""
+        scroll_value = self.games_list.verticalScrollBar().value()
+        selected_key = None
+        if self.current_selected_game is not None:
+            selected_key = old_catalog.key(self.current_selected_game)
+        self.current_selected_game = None
+        
+        self.current_games_list = self.current_listing()
+        self.display_games(self.results_label.text())
+        
+        if selected_key is not None:
+            for row, index in enumerate(self.shown_games):
+                if self.catalog.key(index) == selected_key:
+                    self.games_list.setCurrentIndex(self.games_model.index(row))
+                    self.current_selected_game = index
+                    break
+        self.games_list.verticalScrollBar().setValue(scroll_value)
+    
+    def current_listing(self):
+        """Catalog indices for what the results page lists, worked out afresh from the catalog"""
+        if self.current_query is not None:
+            return self.search_games(self.current_query, self.current_query_fuzzy)
+        if self.showing_new_games:
+            # A copy, as the rows shown must not grow along with new_games
+            return self.catalog.live(list(self.new_games))
+        return self.catalog.live()
     
     def show_all_games(self):
-        if not self.combined_downloads:
+        if not self.catalog:
             self.show_warning("No games available to display.")
             return
         
-        self.current_games_list = self.combined_downloads
+        self.clear_search_input()
+        self.current_games_list = self.catalog.live()
+        self.current_query = None
+        self.showing_new_games = False
         self.display_games("All Available Games")
-        self.previous_page = 1
-        self.stacked_widget.setCurrentIndex(3)
+        self.stacked_widget.setCurrentWidget(self.results_page)
+    
+    def show_new_games(self):
+        self.clear_search_input()
+        self.current_query = None
+        self.showing_new_games = True
+        self.current_games_list = self.current_listing()
+        self.display_games("New Since Last Run")
+        self.stacked_widget.setCurrentWidget(self.results_page)
+    
+    def clear_search_input(self):
+        # Clearing the field would start a redundant search for everything
+        self.search_input.blockSignals(True)
+        self.search_input.clear()
+        self.search_input.blockSignals(False)
     
     def show_search_page(self):
-        self.previous_page = 1
-        self.stacked_widget.setCurrentIndex(2)
+        self.show_all_games()
+        self.search_input.setFocus()
     
     def show_main_page(self):
-        self.stacked_widget.setCurrentIndex(1)
+        self.stacked_widget.setCurrentWidget(self.main_page)
+        # Nothing to look ahead for while the list is hidden
+        self.cover_loader.prefetch(())
     
-    def show_previous_page(self):
-        if hasattr(self, 'previous_page'):
-            self.stacked_widget.setCurrentIndex(self.previous_page)
-        else:
-            self.show_main_page()
-    
-    def perform_search(self):
-        query = self.search_input.text().strip()
+    def show_search_results(self, query, search_results, fuzzy):
+        self.showing_new_games = False
         if not query:
-            self.show_warning("Please enter a search term.")
-            return
-        
-        search_results = []
-        for game in self.combined_downloads:
-            game_title = game.get("title", "")
-            clean_title = self.extract_clean_game_name(game_title)
-            if query.lower() in clean_title.lower():
-                search_results.append(game)
-        
-        if not search_results:
-            self.show_info("No games found with that search query.")
+            self.current_games_list = search_results
+            self.current_query = None
+            self.display_games("All Available Games")
             return
         
         self.current_games_list = search_results
-        self.display_games(f"Search Results for '{query}'")
-        self.previous_page = 2
-        self.stacked_widget.setCurrentIndex(3)
+        self.current_query = query
+        self.current_query_fuzzy = fuzzy
+        if not search_results:
+            self.display_games(f"No games found for '{query}'")
+        elif fuzzy:
+            # No title contains the query as typed; these are the closest ranked matches
+            self.display_games(f"Closest Matches for '{query}'")
+        else:
+            self.display_games(f"Search Results for '{query}'")
+    
+    def search_games(self, query, fuzzy=False):
+        try:
+            if fuzzy:
+                return closest_matches(self.catalog, self.search_index, query)
+            return exact_matches(self.catalog, self.search_index, query)
+        except QuerySyntaxError:
+            return []
     
     def display_games(self, title):
         self.results_label.setText(title)
-        self.games_list.clear()
-        
-        for game in self.current_games_list:
-            title = game.get("title", "No Title")
-            file_size = game.get("fileSize", "No Size")
-            item_text = f"{title} | {file_size}"
-            self.games_list.addItem(item_text)
-    
-    def on_game_selected(self, item):
-        index = self.games_list.row(item)
-        if 0 <= index < len(self.current_games_list):
-            self.current_selected_game = self.current_games_list[index]
-            self.show_game_image(self.current_selected_game.get("title", ""))
-    
-    def show_game_image(self, game_title):
-        if not game_title:
+        self.shown_games = self.list_controls.arrange(self.catalog, self.current_games_list)
+        self.games_model.set_rows(self.catalog, self.shown_games)
+        self.prefetch_timer.start()
+    
+    def on_game_selected(self, model_index):
+        index = self.games_model.catalog_index(model_index.row())
+        if index is not None:
+            self.current_selected_game = index
+            self.show_game_image(self.catalog.name(index))
+            self.prefetch_timer.start()
+    
+    def show_game_image(self, clean_title):
+        if not clean_title:
+            self.current_cover_title = None
+            self.cover_loader.deselect()
             self.image_preview.setText("No game title available")
             return
 
-        clean_title = self.extract_clean_game_name(game_title)
-        self.image_preview.setText(f"Loading image for: {clean_title}")
-        QApplication.processEvents()
+        self.current_cover_title = clean_title
 
         # Try to load from cache first
-        if clean_title in self.image_cache:
-            self.display_image_preview(self.image_cache[clean_title])
+        cached = self.image_cache.get(clean_title)
+        if cached is not None:
+            self.cover_loader.deselect()
+            pixmap, self.current_image_url = cached
+            self.display_image_preview(pixmap)
             return
 
+        self.image_preview.setText(f"Loading image for: {clean_title}")
+        self.current_image_url = None
         # Search SteamGridDB in background
-        QTimer.singleShot(0, lambda: self.fetch_steamgrid_image(clean_title))
+        self.cover_loader.request(clean_title)
     
-    def fetch_steamgrid_image(self, game_title):
-        try:
-            headers = {
-                'Authorization': f'Bearer {self.steamgrid_api_key}',
-                'User-Agent': 'Feather Game Downloader/1.0'
-            }
-            
-            # First search for the game ID
-            search_url = f"https://www.steamgriddb.com/api/v2/search/autocomplete/{urllib.parse.quote(game_title)}"
-            search_response = requests.get(search_url, headers=headers, timeout=10)
-            
-            if search_response.status_code != 200:
-                raise Exception(f"API returned status code {search_response.status_code}")
-                
-            search_data = search_response.json()
-            
-            if not search_data.get('success', False) or not search_data.get('data', []):
-                raise Exception("No results found on SteamGridDB")
-                
-            # Get the first result's ID
-            game_id = search_data['data'][0]['id']
-            
-            # Now get grids (cover art) for this game
-            grids_url = f"https://www.steamgriddb.com/api/v2/grids/game/{game_id}"
-            grids_response = requests.get(grids_url, headers=headers, timeout=10)
-            
-            if grids_response.status_code != 200:
-                raise Exception(f"API returned status code {grids_response.status_code}")
-                
-            grids_data = grids_response.json()
-            
-            if not grids_data.get('success', False) or not grids_data.get('data', []):
-                raise Exception("No cover art found for this game")
-                
-            # Get the first image URL
-            image_url = grids_data['data'][0]['url']
-            
-            # Download the image
-            image_response = requests.get(image_url, headers={
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }, timeout=10)
-            
-            if image_response.status_code == 200:
-                pixmap = QPixmap()
-                pixmap.loadFromData(image_response.content)
-                
-                if not pixmap.isNull():
-                    # Cache the image
-                    self.image_cache[game_title] = pixmap
-                    self.current_image_url = image_url
-                    self.display_image_preview(pixmap)
-                    return
-            
-            # If we get here, no image was found
-            self.display_fallback_image()
-            
-        except Exception as e:
-            print(f"Error loading image from SteamGridDB: {str(e)}")
+    def on_cover_ready(self, title, image, image_url):
+        self.failed_covers.pop(title, None)
+        pixmap = QPixmap.fromImage(image)
+        self.image_cache.put(title, pixmap, image_url)
+        # The user may have moved on while this cover was downloading
+        if title == self.current_cover_title:
+            self.current_image_url = image_url
+            self.display_image_preview(pixmap)
+    
+    def on_cover_failed(self, title, error):
+        self.failed_covers[title] = time.monotonic()
+        # Prefetch misses are expected and not worth reporting
+        if title == self.current_cover_title:
+            print(f"Error loading image from SteamGridDB: {error}")
             self.display_fallback_image()
     
+    def prefetch_covers(self):
+        """Queue covers for the selection's neighbours, nearest first, then the visible rows"""
+        if self.stacked_widget.currentWidget() is not self.results_page:
+            return
+        rows = []
+        current_row = self.games_list.currentIndex().row()
+        if current_row >= 0:
+            for distance in range(1, self.prefetch_neighbours + 1):
+                rows += [current_row + distance, current_row - distance]
+        viewport = self.games_list.viewport().rect()
+        top_row = self.games_list.indexAt(viewport.topLeft()).row()
+        if top_row >= 0:
+            bottom_row = self.games_list.indexAt(viewport.bottomLeft()).row()
+            if bottom_row < 0:
+                bottom_row = self.games_model.rowCount() - 1
+            rows += range(top_row, bottom_row + 1)
+        
+        # Neither the selection, which is loaded on its own, nor a title that just failed
+        # (e.g. while offline), which would only fail again
+        now = time.monotonic()
+        titles = []
+        for row in rows:
+            index = self.games_model.catalog_index(row)
+            if index is None:
+                continue
+            clean_title = self.catalog.name(index)
+            if not clean_title or clean_title == self.current_cover_title or clean_title in self.image_cache:
+                continue
+            failed = self.failed_covers.get(clean_title)
+            if failed is not None and now - failed < self.cover_retry_delay:
+                continue
+            titles.append(clean_title)
+        self.cover_loader.prefetch(titles)
+    
     def display_fallback_image(self):
         # Create a simple fallback image
         pixmap = QPixmap(400, 400)
@@ -760,33 +1089,32 @@ class GameDownloaderApp(QMainWindow):
         self.image_preview.setPixmap(scaled_pixmap)
     
     def download_selected_game(self):
-        selected_items = self.games_list.selectedItems()
-        if not selected_items:
+        selected_indexes = self.games_list.selectedIndexes()
+        if not selected_indexes:
             self.show_warning("Please select a game first.")
             return
         
-        self.download_game(selected_items[0])
+        self.download_game(selected_indexes[0])
     
-    def download_game(self, item):
-        index = self.games_list.row(item)
-        if 0 <= index < len(self.current_games_list):
-            selected_game = self.current_games_list[index]
-            magnet_link = selected_game.get("uris", [None])[0]
+    def download_game(self, model_index):
+        selected_game = self.games_model.catalog_index(model_index.row())
+        if selected_game is not None:
+            magnet_link = self.catalog.magnet(selected_game)
             
             if magnet_link:
-                self.show_info(f"Opening magnet link for: {selected_game['title']}")
+                self.show_info(f"Opening magnet link for: {self.catalog.title(selected_game)}")
                 webbrowser.open(magnet_link)
             else:
                 self.show_error("No magnet link found for the selected game.")
     
     def surprise_me(self):
-        if not self.combined_downloads:
+        if not self.catalog:
             self.show_warning("No games available to select.")
             return
         
         # Select a random game
-        random_game = random.choice(self.combined_downloads)
-        magnet_link = random_game.get("uris", [None])[0]
+        random_game = random.choice(self.catalog.live())
+        magnet_link = self.catalog.magnet(random_game)
         
         if not magnet_link:
             self.show_error("No magnet link found for the selected game.")
@@ -796,7 +1124,7 @@ class GameDownloaderApp(QMainWindow):
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Question)
         msg.setWindowTitle("Surprise Game!")
-        msg.setText(f"Would you like to download:\n\n{random_game['title']}?")
+        msg.setText(f"Would you like to download:\n\n{self.catalog.title(random_game)}?")
         msg.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
         msg.setDefaultButton(QMessageBox.No)
         
@@ -824,9 +1152,17 @@ class GameDownloaderApp(QMainWindow):
         # Show the dialog and check the response
         response = msg.exec_()
         if response == QMessageBox.Yes:
-            self.show_info(f"Opening magnet link for: {random_game['title']}")
+            self.show_info(f"Opening magnet link for: {self.catalog.title(random_game)}")
             webbrowser.open(magnet_link)
     
+    def closeEvent(self, event):
+        self.cover_loader.cancel()
+        # Stop a running load and let its thread wind down rather than tearing it down mid-flight
+        if self.loader and self.loader.isRunning():
+            self.loader.cancel()
+            self.loader.wait()
+        super().closeEvent(event)
+    
     def show_error(self, message):
         msg = QMessageBox()
         msg.setIcon(QMessageBox.Critical)
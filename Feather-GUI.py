@@ -1,8 +1,12 @@
 import sys
-import requests
 import webbrowser
 from PyQt5.QtCore import Qt
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QLineEdit, QListWidget, QPushButton
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QLineEdit, QListView, QPushButton
+from feather_sources import read_urls, load_catalog
+from feather_catalog import Catalog
+from feather_search import SubstringIndex
+from feather_query import QUERY_HELP
+from feather_qt import LiveSearch, GameListModel, ListControls
 
 class GameDownloader(QWidget):
     def __init__(self):
@@ -13,75 +17,67 @@ class GameDownloader(QWidget):
         
         self.layout = QVBoxLayout()
         self.search_bar = QLineEdit(self)
-        self.search_bar.setPlaceholderText("Search for a game...")
+        self.search_bar.setPlaceholderText("Search for a game, e.g. witcher size:<30GB date:>2024")
+        self.search_bar.setToolTip(QUERY_HELP)
         self.search_bar.setStyleSheet("background-color: #333; color: white; padding: 5px;")
-        self.search_bar.returnPressed.connect(self.search_game)
+        # Filters while typing; the search runs off the GUI thread
+        self.live_search = LiveSearch(self.search_bar)
+        self.live_search.results_ready.connect(self.show_search_results)
         
-        self.game_list = QListWidget(self)
+        self.list_controls = ListControls(self)
+        self.list_controls.changed.connect(lambda: self.display_games(self.listed_games))
+        
+        # Only the visible rows are ever materialized
+        self.game_model = GameListModel(self)
+        self.game_list = QListView(self)
+        self.game_list.setModel(self.game_model)
+        self.game_list.setUniformItemSizes(True)
         self.game_list.setStyleSheet("background-color: #222; color: white;")
-        self.game_list.itemDoubleClicked.connect(self.open_magnet_link)
+        self.game_list.doubleClicked.connect(self.open_magnet_link)
         
         self.layout.addWidget(self.search_bar)
+        self.layout.addWidget(self.list_controls)
         self.layout.addWidget(self.game_list)
         self.setLayout(self.layout)
         
         self.urls_file = "urls.txt"
-        self.combined_downloads = []
+        self.catalog = Catalog()
+        self.listed_games = []  # catalog indices before sorting and filtering
+        self.search_index = SubstringIndex()
         self.load_games()
     
     def load_games(self):
-        urls = []
         try:
-            with open(self.urls_file, 'r') as file:
-                urls = [line.strip() for line in file.readlines() if line.strip()]
+            urls = read_urls(self.urls_file)
         except FileNotFoundError:
             print(f"File {self.urls_file} not found. Please ensure the file exists.")
             return
         
-        for url in urls:
-            data = self.fetch_data_from_url(url)
-            if data:
-                downloads = data.get("downloads", [])
-                self.combined_downloads.extend(downloads)
+        self.catalog = load_catalog(urls)
+        self.search_index = SubstringIndex(self.catalog.keys, self.catalog.tokens)
+        self.live_search.set_index(self.search_index, self.catalog)
         
-        self.display_games(self.combined_downloads)
-    
-    def fetch_data_from_url(self, url):
-        try:
-            response = requests.get(url)
-            if response.status_code == 200:
-                return response.json()
-            else:
-                print(f"Failed to fetch data from {url}. Status code: {response.status_code}")
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching data from {url}: {e}")
-        return None
+        self.display_games(range(len(self.catalog)))
     
     def display_games(self, games_list):
-        self.game_list.clear()
-        for game in games_list:
-            title = game.get("title", "No Title")
-            file_size = game.get("fileSize", "No Size")
-            item_text = f"{title} | {file_size}"
-            self.game_list.addItem(item_text)
+        self.listed_games = games_list
+        self.game_model.set_rows(self.catalog, self.list_controls.arrange(self.catalog, games_list))
 
     
-    def search_game(self):
-        query = self.search_bar.text().strip().lower()
-        filtered_games = [game for game in self.combined_downloads if query in game.get("title", "").lower()]
+    def show_search_results(self, query, filtered_games, fuzzy):
+        # When nothing contains the text as typed, filtered_games holds the closest titles, best first
         self.display_games(filtered_games)
     
-    def open_magnet_link(self, item):
-        selected_title = item.text()
-        for game in self.combined_downloads:
-            if game.get("title") == selected_title:
-                magnet_link = game.get("uris", [None])[0]
-                if magnet_link:
-                    print(f"Opening magnet link for: {selected_title}")
-                    webbrowser.open(magnet_link)
-                else:
-                    print("No magnet link found for the selected game.")
-                break
+    def open_magnet_link(self, model_index):
+        index = self.game_model.catalog_index(model_index.row())
+        if index is None:
+            return
+        magnet_link = self.catalog.magnet(index)
+        if magnet_link:
+            print(f"Opening magnet link for: {self.catalog.title(index)}")
+            webbrowser.open(magnet_link)
+        else:
+            print("No magnet link found for the selected game.")
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
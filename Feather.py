@@ -1,5 +1,8 @@
-import requests
 import webbrowser
+from feather_sources import read_urls, load_catalog
+from feather_search import SubstringIndex
+from feather_query import exact_matches, closest_matches, QuerySyntaxError
+from feather_catalog import SORT_ORDERS
 
 gray_color = "\033[90m"
 reset_color = "\033[0m"
@@ -28,95 +31,119 @@ ascii_art = """
 
 gray_ascii = "\n".join(gray_color + line + reset_color for line in ascii_art.split("\n"))
 
-print(gray_ascii)
-
 urls_file = "urls.txt"
 
-urls = []
-try:
-    with open(urls_file, 'r') as file:
-        urls = [line.strip() for line in file.readlines() if line.strip()]
-except FileNotFoundError:
-    print(f"File {urls_file} not found. Please ensure the file exists.")
-    exit()
+# Loaded by main(); the functions below all work on it
+catalog = None
 
-def fetch_data_from_url(url):
-    try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"Failed to fetch data from {url}. Status code: {response.status_code}")
-            return None
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching data from {url}: {e}")
-        return None
-
-combined_downloads = []
-for url in urls:
-    data = fetch_data_from_url(url)
-    if data:
-        downloads = data.get("downloads", [])
-        combined_downloads.extend(downloads)
+# Built on first use; every search after that is an index lookup instead of a full scan
+search_index = None
 
 def display_games(games_list):
-    """Function to display games with their index and title."""
-    for index, game in enumerate(games_list):
-        title = game.get("title", "No Title")
-        file_size = game.get("fileSize", "No Size")
-        print(f"[{index + 1}] {title} | {file_size}")
-
-def search_game(query):
-    """Function to search games by a partial title."""
-    query_lower = query.lower()
-    filtered_games = [game for game in combined_downloads if query_lower in game.get("title", "").lower()]
-    return filtered_games
-
-print("Choose an option:")
-print("1. Show all games")
-print("2. Search for a game")
-
-try:
-    choice = int(input("\nEnter your choice (1 or 2): "))
-
-    if choice == 1:
-        print("\nShowing all games:")
-        display_games(combined_downloads)
-        games_list_to_select_from = combined_downloads
-    elif choice == 2:
-        query = input("\nEnter the game title: ").strip()
-        search_results = search_game(query)
-
-        if search_results:
-            print("\nSearch results:")
-            display_games(search_results)
-            games_list_to_select_from = search_results
+    """Function to display games (catalog indices) with their number and title."""
+    for number, index in enumerate(games_list):
+        print(f"[{number + 1}] {catalog.label(index)}")
+
+def search_game(query, fuzzy=False):
+    """Function to search games by a partial title or a query, or rank the closest titles when fuzzy."""
+    global search_index
+    if search_index is None:
+        search_index = SubstringIndex(catalog.keys, catalog.tokens)
+    if fuzzy:
+        return closest_matches(catalog, search_index, query)
+    return exact_matches(catalog, search_index, query)
+
+def arrange_games(games_list):
+    """Function to ask for a sort order and size limit, answered from the catalog's sorted indexes."""
+    order = input("Sort by newest, oldest, largest or smallest (Enter to keep this order): ").strip().lower()
+    sort, descending = SORT_ORDERS.get(order, (None, False))
+    if order and sort is None:
+        print("Unknown order, keeping this order.")
+    ranges = None
+    limit = input("Only games under how many GB? (Enter for any size): ").strip()
+    if limit:
+        try:
+            ranges = {"size": (None, int(float(limit) * (1 << 30)))}
+        except (ValueError, OverflowError):
+            print("Not a number, showing every size.")
+    if sort is None and ranges is None:
+        return games_list
+    return catalog.arrange(games_list, sort, descending, ranges)
+
+def main():
+    """Load every source, then let the user list or search games and open one."""
+    global catalog
+    print(gray_ascii)
+
+    try:
+        urls = read_urls(urls_file)
+    except FileNotFoundError:
+        print(f"File {urls_file} not found. Please ensure the file exists.")
+        return
+
+    catalog = load_catalog(urls)
+
+    print("Choose an option:")
+    print("1. Show all games")
+    print("2. Search for a game")
+
+    try:
+        choice = int(input("\nEnter your choice (1 or 2): "))
+
+        if choice == 1:
+            games_list_to_select_from = arrange_games(range(len(catalog)))
+            print("\nShowing all games:")
+            display_games(games_list_to_select_from)
+        elif choice == 2:
+            query = input("\nEnter the game title (or e.g. witcher size:<30GB date:>2024 source:gog -demo): ").strip()
+            heading = "Search results:"
+            try:
+                search_results = search_game(query)
+                if not search_results:
+                    search_results = search_game(query, fuzzy=True)
+                    heading = "No exact matches. Closest matches:"
+            except QuerySyntaxError as e:
+                print(f"\nInvalid query: {e}")
+                search_results = []
+
+            if search_results:
+                search_results = arrange_games(search_results)
+
+            if search_results:
+                print(f"\n{heading}")
+                display_games(search_results)
+                games_list_to_select_from = search_results
+            else:
+                print("\nNo games found with that search query.")
+                games_list_to_select_from = []
         else:
-            print("\nNo games found with that search query.")
+            print("Invalid option.")
             games_list_to_select_from = []
-    else:
-        print("Invalid option.")
-        games_list_to_select_from = []
 
-    if games_list_to_select_from:
-        try:
-            selection = int(input("\nEnter the game number: "))
-            if 1 <= selection <= len(games_list_to_select_from):
+        if games_list_to_select_from:
+            try:
+                selection = int(input("\nEnter the game number: "))
+                if 1 <= selection <= len(games_list_to_select_from):
 
-                selected_game = games_list_to_select_from[selection - 1]
-                magnet_link = selected_game.get("uris", [None])[0]
+                    selected_game = games_list_to_select_from[selection - 1]
+                    magnet_link = catalog.magnet(selected_game)
 
-                if magnet_link:
-                    print(f"Opening magnet link for: {selected_game['title']}")
-                    webbrowser.open(magnet_link)
+                    if magnet_link:
+                        print(f"Opening magnet link for: {catalog.title(selected_game)}")
+                        webbrowser.open(magnet_link)
+                    else:
+                        print("No magnet link found for the selected game.")
                 else:
-                    print("No magnet link found for the selected game.")
-            else:
-                print("Invalid selection.")
-        except ValueError:
-            print("Please enter a valid number.")
-    else:
-        print("No games to select from.")
-
-except ValueError:
-    print("Please enter a valid number.")
+                    print("Invalid selection.")
+            except ValueError:
+                print("Please enter a valid number.")
+        else:
+            print("No games to select from.")
+
+    except ValueError:
+        print("Please enter a valid number.")
+
+
+# Large sources are parsed in worker processes that import this file again, which must not rerun the menu
+if __name__ == "__main__":
+    main()
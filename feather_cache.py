@@ -0,0 +1,288 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import tempfile
+import threading
+
+# Default disk budget for cached cover images
+COVER_CACHE_BYTES = 200 * 1024 * 1024
+
+
+def cache_dir(*parts):
+    """Return (and create) Feather's per-user cache directory or a subdirectory of it."""
+    if sys.platform.startswith("win"):
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        root = os.path.join(base, "Feather", "cache")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        root = os.path.join(base, "feather")
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def cache_key(text):
+    """Stable file name for an arbitrary key such as a URL."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def atomic_write(path, data):
+    """Write bytes to path without ever leaving a half-written file behind."""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class CacheWriter:
+    """Streams a response body into the cache; nothing is visible until commit()."""
+
+    def __init__(self, cache, url, headers):
+        self.cache = cache
+        self.url = url
+        self.headers = headers
+        self.sha256 = hashlib.sha256()
+        self.file = None
+        try:
+            fd, self.tmp_path = tempfile.mkstemp(dir=cache.directory, prefix=".tmp-")
+            self.file = os.fdopen(fd, "wb")
+        except OSError as e:
+            print(f"Could not cache {url}: {e}")
+
+    def write(self, chunk):
+        self.sha256.update(chunk)
+        if self.file is None:
+            return
+        try:
+            self.file.write(chunk)
+        except OSError as e:
+            # A full or read-only disk must never break the download itself
+            print(f"Could not cache {self.url}: {e}")
+            self.discard()
+
+    def commit(self):
+        """Make the body visible in the cache; returns whether it now is."""
+        if self.file is None:
+            return False
+        try:
+            self.file.close()
+            body_path, _ = self.cache._paths(self.url)
+            os.replace(self.tmp_path, body_path)
+            self.cache._write_meta(self.url, self.headers, self.sha256.hexdigest())
+        except OSError as e:
+            print(f"Could not cache {self.url}: {e}")
+            return False
+        finally:
+            self.file = None
+        return True
+
+    def discard(self):
+        if self.file is None:
+            return
+        self.file.close()
+        self.file = None
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+class SourceCache:
+    """Stores each source's last response body with its ETag and Last-Modified."""
+
+    def __init__(self, directory=None):
+        self.directory = directory or cache_dir("sources")
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _paths(self, url):
+        key = cache_key(url)
+        return (os.path.join(self.directory, key + ".json"),
+                os.path.join(self.directory, key + ".meta"))
+
+    def meta(self, url):
+        """Return the stored validators for url, or None when nothing is cached."""
+        body_path, meta_path = self._paths(url)
+        if not os.path.exists(body_path):
+            return None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def content_hash(self, url):
+        """Hex SHA-256 of the cached body of url, or None when nothing is cached."""
+        meta = self.meta(url)
+        return meta.get("sha256") if meta else None
+
+    def conditional_headers(self, url):
+        """Headers that let the server answer 304 when our copy is still current."""
+        meta = self.meta(url)
+        headers = {}
+        if meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def body_size(self, url):
+        """Bytes in the cached body of url, or None when nothing is cached."""
+        try:
+            return os.path.getsize(self._paths(url)[0])
+        except OSError:
+            return None
+
+    def iter_chunks(self, url, chunk_size=1 << 16):
+        """Yield the cached body in chunks. Raises OSError when it is missing."""
+        body_path, _ = self._paths(url)
+        with open(body_path, "rb") as file:
+            while True:
+                chunk = file.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def writer(self, url, headers):
+        """Start streaming a fresh 200 response body into the cache."""
+        return CacheWriter(self, url, headers)
+
+    def _write_meta(self, url, headers, sha256):
+        _, meta_path = self._paths(url)
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "sha256": sha256,
+        }
+        atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+
+
+class CoverCache:
+    """Cover images on disk, keyed by their SteamGridDB asset URL.
+
+    Each cover is kept as the original download plus a copy pre-scaled to the
+    preview size. Total size stays under max_bytes by evicting the least
+    recently used covers; use is recorded in the files' modification times, so
+    the order survives restarts. How each title was resolved (its SteamGridDB
+    game id, its image URL, or when it was last found missing) is stored as
+    well, so showing a title seen before needs no network at all. Safe to
+    share between threads.
+    """
+
+    def __init__(self, directory=None, max_bytes=COVER_CACHE_BYTES):
+        self.directory = directory or cache_dir("covers")
+        os.makedirs(self.directory, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.titles_path = os.path.join(self.directory, "titles.json")
+        self.titles = self._load_titles()
+        self.entries = self._scan()  # key -> (bytes on disk, last use)
+        self.total = sum(size for size, used in self.entries.values())
+
+    def _load_titles(self):
+        try:
+            with open(self.titles_path, "r", encoding="utf-8") as file:
+                titles = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(titles, dict):
+            return {}
+        return {title: record for title, record in titles.items() if isinstance(record, dict)}
+
+    def _scan(self):
+        entries = {}
+        for entry in os.scandir(self.directory):
+            key, _, kind = entry.name.partition(".")
+            if kind not in ("img", "preview"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            size, used = entries.get(key, (0, 0.0))
+            entries[key] = (size + stat.st_size, max(used, stat.st_mtime))
+        return entries
+
+    def _path(self, key, kind):
+        return os.path.join(self.directory, f"{key}.{kind}")
+
+    def resolution(self, title):
+        """Return what is known about title's cover, e.g. {"game_id": ..., "url": ...}."""
+        with self.lock:
+            return dict(self.titles.get(title, {}))
+
+    def remember(self, title, **fields):
+        """Update title's resolution record; a field set to None is removed."""
+        with self.lock:
+            record = dict(self.titles.get(title, {}))
+            record.update(fields)
+            self.titles[title] = {name: value for name, value in record.items() if value is not None}
+            try:
+                atomic_write(self.titles_path, json.dumps(self.titles).encode("utf-8"))
+            except OSError as e:
+                print(f"Could not cache the cover of {title}: {e}")
+
+    def preview(self, url):
+        """Return the pre-scaled image bytes for url, or None."""
+        return self._read(url, "preview")
+
+    def original(self, url):
+        """Return the image bytes for url as downloaded, or None."""
+        return self._read(url, "img")
+
+    def _read(self, url, kind):
+        key = cache_key(url)
+        path = self._path(key, kind)
+        with self.lock:
+            try:
+                with open(path, "rb") as file:
+                    data = file.read()
+                os.utime(path)
+            except OSError:
+                return None
+            if key in self.entries:
+                self.entries[key] = (self.entries[key][0], time.time())
+        return data
+
+    def store(self, url, original, preview):
+        """Save a downloaded cover and its preview, then evict down to the budget."""
+        key = cache_key(url)
+        with self.lock:
+            try:
+                atomic_write(self._path(key, "img"), original)
+                atomic_write(self._path(key, "preview"), preview)
+            except OSError as e:
+                # A full or read-only disk only costs a download next time
+                print(f"Could not cache {url}: {e}")
+                return
+            size, _ = self.entries.get(key, (0, 0.0))
+            self.total += len(original) + len(preview) - size
+            self.entries[key] = (len(original) + len(preview), time.time())
+            self._evict(keep=key)
+
+    def _evict(self, keep):
+        if self.total <= self.max_bytes:
+            return
+        for key, (size, used) in sorted(self.entries.items(), key=lambda item: item[1][1]):
+            if self.total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            for kind in ("img", "preview"):
+                try:
+                    os.remove(self._path(key, kind))
+                except OSError:
+                    pass
+            del self.entries[key]
+            self.total -= size
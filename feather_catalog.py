@@ -0,0 +1,603 @@
+import re
+import sys
+import base64
+import bisect
+import binascii
+import functools
+from array import array
+from datetime import datetime, timezone
+from feather_search import normalize, tokenize
+
+# Everything from the first bracket, parenthesis or bar on is release detail, not the game's name
+_DETAIL_RE = re.compile(r"[\[\(\|]")
+
+
+# BitTorrent info-hash in a magnet link: 40 hex digits, or 32 base32 characters in older links
+_BTIH_RE = re.compile(r"xt=urn:btih:([0-9a-z]{40}|[a-z2-7]{32})(?![0-9a-z])", re.IGNORECASE)
+
+
+# Stored in the numeric columns for a size or date that is missing or unreadable
+UNKNOWN = -1
+
+# "60 GB", "1.5GB", "700 MiB", "1,2 GB", "1,024 MB"; sizes are counted in powers of 1024 as sources mean them.
+# A comma before groups of exactly three digits separates thousands, any other comma is a decimal point.
+_SIZE_RE = re.compile(r"^\s*(?:(\d{1,3}(?:,\d{3})+(?:\.\d+)?)|(\d+(?:[.,]\d+)?))\s*([kmgt]?i?b|bytes?)?\s*$",
+                      re.IGNORECASE)
+_SIZE_UNITS = {"k": 1 << 10, "m": 1 << 20, "g": 1 << 30, "t": 1 << 40}
+_MAX_SIZE = float(1 << 63)
+
+# Orders offered by every front-end: name -> (field, descending)
+SORT_ORDERS = {
+    "newest": ("date", True),
+    "oldest": ("date", False),
+    "largest": ("size", True),
+    "smallest": ("size", False),
+}
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_size(text):
+    """Bytes in a size such as "60 GB" (a bare number is bytes), or None if it is not one or too large."""
+    match = _SIZE_RE.match(text or "")
+    if match is None:
+        return None
+    grouped, plain, unit = match.groups()
+    digits = grouped.replace(",", "") if grouped else plain.replace(",", ".")
+    number = float(digits) * _SIZE_UNITS.get((unit or "b")[0].lower(), 1)
+    # Sizes are stored as signed 64-bit integers; anything beyond is no real size
+    if not number < _MAX_SIZE:
+        return None
+    return int(number)
+
+
+def parse_date(text):
+    """Epoch seconds of an ISO 8601 date such as "2023-04-16T23:00:00.000Z", or None."""
+    if not text:
+        return None
+    if text.endswith(("Z", "z")):
+        text = text[:-1] + "+00:00"
+    try:
+        moment = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def info_hash(uri):
+    """Lowercase hex info-hash of a magnet link, or None if uri does not carry one."""
+    match = _BTIH_RE.search(uri)
+    if match is None:
+        return None
+    digest = match.group(1)
+    if len(digest) == 32:
+        try:
+            return base64.b32decode(digest.upper()).hex()
+        except binascii.Error:
+            return None
+    return digest.lower()
+
+
+def clean_name(title):
+    """The game's name from a release title, e.g. "Hades" from "Hades [FitGirl Repack]"."""
+    return _DETAIL_RE.split(title, 1)[0].strip()
+
+
+def _text(value):
+    if value is None:
+        return ""
+    return sys.intern(value if isinstance(value, str) else str(value))
+
+
+def _search_forms(title):
+    name = sys.intern(clean_name(title))
+    name_key = sys.intern(normalize(name))
+    # name_key is already normalized, so tokenizing it gives the tokens of name
+    tokens = tuple(map(sys.intern, tokenize(name_key)))
+    return name, sys.intern(normalize(title)), name_key, tokens
+
+
+def _identities(key, uris):
+    """What makes two entries the same release: their normalized title and every magnet info-hash."""
+    identities = [key] if key else []
+    for uri in uris:
+        digest = info_hash(uri)
+        if digest:
+            identities.append(("btih", digest))
+    return identities
+
+
+def _listing_key(key, uris):
+    """Stable key of one source's entry across versions of that source: its first info-hash, else its title."""
+    for uri in uris:
+        digest = info_hash(uri)
+        if digest:
+            return ("btih", digest)
+    return key or ("uris", uris)
+
+
+class Catalog:
+    """Column store holding every download entry from every source.
+
+    Entries are addressed by integer index. Only the fields Feather shows are
+    kept; repeated strings (sizes, dates, titles listed by several sources) are
+    interned so each distinct value is stored once. Search forms of every title
+    are computed once here, when the entry is added, so queries only match.
+    """
+
+    def __init__(self):
+        self.sources = []               # source URL per source id
+        self.titles = []
+        self.names = []                 # clean_name() of each title
+        self.keys = []                  # normalized title, searched by the CLI and Feather-GUI
+        self.name_keys = []             # normalized clean name, searched by Feather+
+        self.tokens = []                # word tokens of the clean name, ranking fuzzy matches
+        self.sizes = []
+        self.dates = []
+        self.size_bytes = array('q')    # parsed fileSize, or UNKNOWN
+        self.timestamps = array('q')    # parsed uploadDate in epoch seconds, or UNKNOWN
+        self.uris = []                  # tuple of URIs per entry
+        self.source_ids = array('H')    # source id per entry
+        self._source_lookup = {}
+        self._origins = {}              # index -> ((source id, uris, key), ...) of entries merged into it
+        self._forms = {}                # title -> (name, key, name_key, tokens), as sources repeat titles
+        self._orders = {}               # field -> (entries covered, retired, ascending order, entries with a value)
+        self._source_entries = (0, None, [])  # (entries covered, retired, ascending indices per source id)
+        self._releases = None           # identity -> entry, see _identities(); built for the first refresh
+        # Entries a refresh removed or replaced; their indices stay taken, as indexes are built over them
+        self.retired = frozenset()
+
+    # Per-entry columns, all of the same length
+    COLUMNS = ("titles", "names", "keys", "name_keys", "tokens", "sizes", "dates",
+               "size_bytes", "timestamps", "uris", "source_ids")
+
+    @classmethod
+    def restore(cls, sources, columns, origins=None, orders=None, retired=()):
+        """Rebuild a catalog from saved columns (see COLUMNS) without recomputing anything.
+
+        origins is what merged_origins() returned, orders maps fields to what
+        sorted_by() returned and retired is the retired set, when they were
+        saved too.
+        """
+        catalog = cls()
+        for url in sources:
+            catalog.source_id(url)
+        for name in cls.COLUMNS:
+            setattr(catalog, name, columns[name])
+        catalog._origins = dict(origins or {})
+        catalog.retired = frozenset(retired)
+        count = len(catalog)
+        for field, order in (orders or {}).items():
+            column = catalog.column(field)
+            known = count - column.count(UNKNOWN) - sum(1 for index in catalog.retired if column[index] != UNKNOWN)
+            catalog._orders[field] = (count, catalog.retired, order, known)
+        return catalog
+
+    def merged_origins(self):
+        """{index: ((source id, uris, key), ...)} of every entry that merges several source entries."""
+        return dict(self._origins)
+
+    def __len__(self):
+        # source_ids is always filled last, so every column covers this many entries
+        return len(self.source_ids)
+
+    def source_id(self, url):
+        """Return the id for a source URL, registering it if needed."""
+        source_id = self._source_lookup.get(url)
+        if source_id is None:
+            source_id = len(self.sources)
+            self.sources.append(url)
+            self._source_lookup[url] = source_id
+        return source_id
+
+    def add(self, entry, source_id):
+        """Append one raw source entry and return its index, or None if it is not an object."""
+        if not isinstance(entry, dict):
+            return None
+        uris = entry.get("uris") or ()
+        if isinstance(uris, str):
+            uris = (uris,)
+        title = _text(entry.get("title"))
+        forms = self._forms.get(title)
+        if forms is None:
+            forms = self._forms[title] = _search_forms(title)
+        name, key, name_key, tokens = forms
+        self.titles.append(title)
+        self.names.append(name)
+        self.keys.append(key)
+        self.name_keys.append(name_key)
+        self.tokens.append(tokens)
+        size = _text(entry.get("fileSize"))
+        date = _text(entry.get("uploadDate"))
+        self.sizes.append(size)
+        self.dates.append(date)
+        parsed_size = parse_size(size)
+        parsed_date = parse_date(date)
+        self.size_bytes.append(UNKNOWN if parsed_size is None else parsed_size)
+        self.timestamps.append(UNKNOWN if parsed_date is None else parsed_date)
+        self.uris.append(tuple(uri for uri in uris if isinstance(uri, str)))
+        self.source_ids.append(source_id)
+        return len(self.titles) - 1
+
+    def extend(self, url, downloads):
+        """Append raw entries that came from the source at url."""
+        source_id = self.source_id(url)
+        for entry in downloads:
+            self.add(entry, source_id)
+
+    def merge(self, other):
+        """Append every entry of another catalog, remapping its source ids."""
+        remap = [self.source_id(url) for url in other.sources]
+        self.titles.extend(other.titles)
+        self.names.extend(other.names)
+        self.keys.extend(other.keys)
+        self.name_keys.extend(other.name_keys)
+        self.tokens.extend(other.tokens)
+        self.sizes.extend(other.sizes)
+        self.dates.extend(other.dates)
+        self.size_bytes.extend(other.size_bytes)
+        self.timestamps.extend(other.timestamps)
+        self.uris.extend(other.uris)
+        offset = len(self.source_ids)
+        for index, origins in other._origins.items():
+            self._origins[offset + index] = tuple((remap[source_id], uris, key) for source_id, uris, key in origins)
+        self.source_ids.extend(remap[source_id] for source_id in other.source_ids)
+
+    def deduplicate(self):
+        """Return a catalog with one entry per release, however many sources list it.
+
+        Entries are the same release when their normalized titles match or
+        their magnet links share an info-hash, transitively. Each group keeps
+        the first entry's fields, with the URIs of all its members (first
+        entry's first), and merged_origins() the source, URIs and normalized
+        title of each member.
+        Returns this catalog itself when no two entries match.
+        """
+        count = len(self)
+        parent = array('I', range(count))
+
+        def find(index):
+            while parent[index] != index:
+                parent[index] = parent[parent[index]]
+                index = parent[index]
+            return index
+
+        # One pass over hash indexes of the first entry seen with each title and info-hash
+        first_with = {}
+        merged = False
+        for index, (key, uris) in enumerate(zip(self.keys, self.uris)):
+            root = index
+            for identity in _identities(key, uris):
+                other_root = find(first_with.setdefault(identity, index))
+                if other_root != root:
+                    # The lower index is the root, so a group is led by its first entry
+                    root, higher = min(root, other_root), max(root, other_root)
+                    parent[higher] = root
+                    merged = True
+        if not merged:
+            return self
+
+        catalog = Catalog()
+        catalog.sources = list(self.sources)
+        catalog._source_lookup = dict(self._source_lookup)
+        members = {}  # row in catalog -> indices here, for rows merging several entries
+        row_of = {}
+        for index in range(count):
+            root = find(index)
+            if root != index:
+                members.setdefault(row_of[root], [root]).append(index)
+                continue
+            row_of[index] = len(catalog)
+            catalog.titles.append(self.titles[index])
+            catalog.names.append(self.names[index])
+            catalog.keys.append(self.keys[index])
+            catalog.name_keys.append(self.name_keys[index])
+            catalog.tokens.append(self.tokens[index])
+            catalog.sizes.append(self.sizes[index])
+            catalog.dates.append(self.dates[index])
+            catalog.size_bytes.append(self.size_bytes[index])
+            catalog.timestamps.append(self.timestamps[index])
+            catalog.uris.append(self.uris[index])
+            catalog.source_ids.append(self.source_ids[index])
+        for row, indices in members.items():
+            origins = [origin for index in indices for origin in self._origin_ids(index)]
+            catalog._origins[row] = tuple(origins)
+            catalog.uris[row] = tuple(dict.fromkeys(uri for _, uris, _ in origins for uri in uris))
+        return catalog
+
+    def diff_source(self, url, fresh, delta):
+        """Add to delta what turns this catalog's entries from url into those of fresh, a catalog of url alone.
+
+        Entries are matched by _listing_key(): one that is gone is retired, one
+        whose fields changed is retired and appended again, and one not seen
+        before is appended as new. Returns False when an entry merging several
+        source entries would change, as only a rebuild can redo the merge.
+        """
+        source_id = self._source_lookup.get(url)
+        unmerged = {}  # listing key -> entries of this source alone with it
+        merged = {}    # listing key -> (uris, key, merged entry it leads or None) of this source's members
+        if source_id is not None:
+            for index in self.source_entries()[source_id]:
+                origins = self._origins.get(index)
+                if origins is None:
+                    unmerged.setdefault(_listing_key(self.keys[index], self.uris[index]), []).append(index)
+                    continue
+                for number, (origin_id, uris, key) in enumerate(origins):
+                    if origin_id == source_id:
+                        # Only the first member's fields were kept, the others only their title
+                        leader = index if number == 0 else None
+                        merged.setdefault(_listing_key(key, uris), []).append((uris, key, leader))
+
+        retired = []
+        appended = []  # (position in fresh, whether it is a new release)
+        for position, (key, uris) in enumerate(zip(fresh.keys, fresh.uris)):
+            listing_key = _listing_key(key, uris)
+            same = unmerged.get(listing_key)
+            members = merged.get(listing_key)
+            if same:
+                index = same.pop()
+                if not self._same_entry(index, fresh, position) or self.uris[index] != uris:
+                    retired.append(index)
+                    appended.append((position, False))
+            elif members:
+                old_uris, old_key, leader = members.pop()
+                if old_uris != uris or old_key != key:
+                    return False
+                if leader is not None and not self._same_entry(leader, fresh, position):
+                    return False
+            else:
+                appended.append((position, True))
+        if any(merged.values()):
+            return False
+
+        retired.extend(index for indices in unmerged.values() for index in indices)
+        delta.retired.update(retired)
+        for position, new in appended:
+            if new:
+                delta.new.append(len(delta.entries))
+            delta.entries.add_row(fresh, position, delta.entries.source_id(url))
+        return True
+
+    def _same_entry(self, index, other, position):
+        return (self.titles[index] == other.titles[position] and self.sizes[index] == other.sizes[position]
+                and self.dates[index] == other.dates[position])
+
+    def add_row(self, other, position, source_id):
+        """Append entry position of another catalog, already parsed, under source_id here."""
+        self.titles.append(other.titles[position])
+        self.names.append(other.names[position])
+        self.keys.append(other.keys[position])
+        self.name_keys.append(other.name_keys[position])
+        self.tokens.append(other.tokens[position])
+        self.sizes.append(other.sizes[position])
+        self.dates.append(other.dates[position])
+        self.size_bytes.append(other.size_bytes[position])
+        self.timestamps.append(other.timestamps[position])
+        self.uris.append(other.uris[position])
+        self.source_ids.append(source_id)
+
+    def _release_identities(self, index):
+        # A merged entry is the same release as anything matching any of its members
+        return [identity for _, uris, key in self._origin_ids(index) for identity in _identities(key, uris)]
+
+    def _release_index(self):
+        # Kept up to date by apply() once built; entries it points to may have been retired since
+        if self._releases is None:
+            releases = {}
+            for index in self.live():
+                for identity in self._release_identities(index):
+                    releases.setdefault(identity, index)
+            self._releases = releases
+        return self._releases
+
+    def merges_with(self, delta):
+        """True when an entry delta appends is the same release as a remaining entry or another appended one.
+
+        deduplicate() would merge those, so the catalog must be rebuilt instead.
+        """
+        releases = self._release_index()
+        retired = self.retired | delta.retired
+        appended = set()
+        for key, uris in zip(delta.entries.keys, delta.entries.uris):
+            for identity in _identities(key, uris):
+                index = releases.get(identity)
+                if (index is not None and index not in retired) or identity in appended:
+                    return True
+                appended.add(identity)
+        return False
+
+    def apply(self, delta):
+        """Make the changes in delta, found by diff_source(); returns the indices of the entries appended."""
+        start = len(self)
+        self.merge(delta.entries)
+        if self._releases is not None:
+            for index in range(start, len(self)):
+                for identity in self._release_identities(index):
+                    self._releases[identity] = index
+        self.retire(delta.retired)
+        return range(start, len(self))
+
+    def column(self, field):
+        """Numeric column of a sortable field: "size" (bytes) or "date" (epoch seconds)."""
+        if field == "size":
+            return self.size_bytes
+        if field == "date":
+            return self.timestamps
+        raise ValueError(f"Unknown field: {field}")
+
+    def _order(self, field):
+        # Built once per field and reused until the catalog grows or retires entries
+        count = len(self)
+        retired = self.retired
+        cached = self._orders.get(field)
+        if cached is not None and cached[0] == count and cached[1] is retired:
+            return cached[2], cached[3]
+        column = self.column(field)
+        indices = self.live(range(count), retired)
+        known = sorted((index for index in indices if column[index] != UNKNOWN), key=column.__getitem__)
+        order = array('I', known)
+        order.extend(index for index in indices if column[index] == UNKNOWN)
+        self._orders[field] = (count, retired, order, len(known))
+        return order, len(known)
+
+    def sorted_by(self, field, descending=False):
+        """Every index ordered by field; entries without a value come last either way."""
+        order, known = self._order(field)
+        if not descending:
+            return order
+        ordered = order[known - 1::-1] if known else array('I')
+        ordered.extend(order[known:])
+        return ordered
+
+    def _span(self, field, low, high):
+        order, known = self._order(field)
+        column = self.column(field)
+        start = 0 if low is None else bisect.bisect_left(order, low, 0, known, key=column.__getitem__)
+        end = known if high is None else bisect.bisect_right(order, high, start, known, key=column.__getitem__)
+        return order, start, max(start, end)
+
+    def between(self, field, low=None, high=None):
+        """Indices whose field lies within [low, high] (either end may be None), ascending by it."""
+        order, start, end = self._span(field, low, high)
+        return order[start:end]
+
+    def count_between(self, field, low=None, high=None):
+        """How many entries between() would return, found by bisection alone."""
+        _, start, end = self._span(field, low, high)
+        return end - start
+
+    def source_entries(self):
+        """Ascending indices of the entries listing each source, per source id."""
+        count = len(self)
+        retired = self.retired
+        covered, covered_retired, postings = self._source_entries
+        if covered == count and covered_retired is retired and len(postings) == len(self.sources):
+            return postings
+        postings = [array('I') for _ in self.sources]
+        for index in self.live(range(count), retired):
+            if index in self._origins:
+                for source_id in self.entry_sources(index):
+                    postings[source_id].append(index)
+            else:
+                postings[self.source_ids[index]].append(index)
+        self._source_entries = (count, retired, postings)
+        return postings
+
+    def entry_sources(self, index):
+        """Distinct source ids listing an entry."""
+        if index not in self._origins:
+            return (self.source_ids[index],)
+        return tuple(dict.fromkeys(source_id for source_id, _, _ in self._origins[index]))
+
+    def live(self, indices=None, retired=None):
+        """indices (every entry when None) without the retired ones, in the same order."""
+        if indices is None:
+            indices = range(len(self))
+        if retired is None:
+            retired = self.retired
+        if not retired:
+            return indices
+        return [index for index in indices if index not in retired]
+
+    def retire(self, indices):
+        """Drop entries from every listing; their indices are never reused."""
+        # A new set rather than an update, as searches on other threads may be reading the old one
+        self.retired = self.retired.union(indices)
+
+    def arrange(self, indices=None, sort=None, descending=False, ranges=None):
+        """Indices (every live entry when None) limited to ranges and ordered by the sort field.
+
+        ranges maps fields to (low, high) bounds as taken by between(); an
+        entry without a value for a bounded field is left out. Without a sort
+        field indices keep their order, e.g. a search's ranking.
+        """
+        ranges = {field: bounds for field, bounds in (ranges or {}).items() if bounds != (None, None)}
+        if indices == range(len(self)):
+            indices = None
+        presorted = None
+        if indices is None and not ranges:
+            return self.sorted_by(sort, descending) if sort else self.live()
+        if indices is None and sort:
+            # Bisect the sorted order of one bounded field, the sort field if it is one
+            presorted = sort if sort in ranges else next(iter(ranges))
+            indices = self.between(presorted, *ranges.pop(presorted))
+        elif indices is None:
+            # Listed in catalog order, so a bounds check per entry beats re-sorting a bisected slice
+            indices = self.live()
+        for field, (low, high) in ranges.items():
+            column = self.column(field)
+            low = UNKNOWN + 1 if low is None else low
+            indices = [index for index in indices if column[index] >= low and (high is None or column[index] <= high)]
+        if sort is None:
+            return indices
+        if presorted == sort:
+            return indices[::-1] if descending else indices
+        column = self.column(sort)
+        if len(indices) * 16 < len(self):
+            # A handful of results sorts faster than a walk over the whole order
+            known = [index for index in indices if column[index] != UNKNOWN]
+            known.sort(key=column.__getitem__, reverse=descending)
+            return known + [index for index in indices if column[index] == UNKNOWN]
+        wanted = bytearray(len(self))
+        for index in indices:
+            wanted[index] = 1
+        return [index for index in self.sorted_by(sort, descending) if wanted[index]]
+
+    def title(self, index):
+        return self.titles[index]
+
+    def name(self, index):
+        return self.names[index]
+
+    def file_size(self, index):
+        return self.sizes[index]
+
+    def upload_date(self, index):
+        return self.dates[index]
+
+    def source(self, index):
+        return self.sources[self.source_ids[index]]
+
+    def _origin_ids(self, index):
+        """(source id, uris, key) of every source entry merged into an entry."""
+        return self._origins.get(index) or ((self.source_ids[index], self.uris[index], self.keys[index]),)
+
+    def origins(self, index):
+        """(source URL, uris) of every source entry merged into an entry, first one first."""
+        return [(self.sources[source_id], uris) for source_id, uris, _ in self._origin_ids(index)]
+
+    def source_count(self, index):
+        """Number of distinct sources listing an entry."""
+        return len(self.entry_sources(index))
+
+    def magnet(self, index):
+        """First URI of an entry, or None."""
+        uris = self.uris[index]
+        return uris[0] if uris else None
+
+    def label(self, index):
+        """Text shown for an entry in every front-end's list."""
+        label = f"{self.titles[index] or 'No Title'} | {self.sizes[index] or 'No Size'}"
+        if index in self._origins:
+            sources = self.source_count(index)
+            if sources > 1:
+                label += f" | {sources} sources"
+        return label
+
+    def key(self, index):
+        """Identity of an entry that survives a reload of the catalog."""
+        return (self.titles[index], self.magnet(index))
+
+
+class CatalogDelta:
+    """Changes a refresh makes to a catalog, found by Catalog.diff_source() and made by Catalog.apply()."""
+
+    def __init__(self):
+        self.retired = set()      # indices of entries gone, or replaced by a new version
+        self.entries = Catalog()  # entries to append: new releases and the new versions of changed ones
+        self.new = []             # positions in entries of the releases not listed before
+
+    def __len__(self):
+        return len(self.retired) + len(self.entries)
+
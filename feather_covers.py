@@ -0,0 +1,323 @@
+import time
+import heapq
+import threading
+import urllib.parse
+import feather_http
+from PyQt5.QtCore import Qt, QBuffer, QByteArray, QIODevice, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage
+from feather_cache import CoverCache
+
+STEAMGRID_API = "https://www.steamgriddb.com/api/v2"
+
+# The image CDN turns away requests that do not look like a browser
+IMAGE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Simultaneous cover lookups
+COVER_WORKERS = 4
+# Of those, how many may be prefetches; the rest stay free for the selected title
+PREFETCH_WORKERS = 3
+
+# How long a title SteamGridDB had nothing for is not asked about again
+MISSING_COVER_TTL = 7 * 24 * 3600
+
+# Edge of the square area Feather+ shows a cover in; cached previews fit inside it
+PREVIEW_SIZE = 380
+
+
+class CoverNotFound(Exception):
+    """SteamGridDB has no usable cover for a title."""
+
+
+class CoverCancelled(Exception):
+    """Raised inside a lookup when nobody wants its result any more."""
+
+
+def _get(url, headers, timeout, cancel):
+    # Checked before every request, so a cancelled lookup stops at the next step
+    if cancel is not None and cancel.is_set():
+        raise CoverCancelled()
+    response = feather_http.get(url, headers=headers, timeout=timeout)
+    if response.status_code != 200:
+        raise CoverNotFound(f"API returned status code {response.status_code}")
+    return response
+
+
+def _api_headers(api_key):
+    return {
+        'Authorization': f'Bearer {api_key}',
+        'User-Agent': 'Feather Game Downloader/1.0'
+    }
+
+
+def find_game_id(title, api_key, timeout=10, cancel=None):
+    """Return the SteamGridDB game id best matching title, or None if there is none."""
+    search_url = f"{STEAMGRID_API}/search/autocomplete/{urllib.parse.quote(title)}"
+    search_data = _get(search_url, _api_headers(api_key), timeout, cancel).json()
+    if not search_data.get('success', False) or not search_data.get('data', []):
+        return None
+    return search_data['data'][0]['id']
+
+
+def find_grid_url(game_id, api_key, timeout=10, cancel=None):
+    """Return the URL of the first grid (cover art) of a game, or None if it has none."""
+    grids_url = f"{STEAMGRID_API}/grids/game/{game_id}"
+    grids_data = _get(grids_url, _api_headers(api_key), timeout, cancel).json()
+    if not grids_data.get('success', False) or not grids_data.get('data', []):
+        return None
+    return grids_data['data'][0]['url']
+
+
+def download_cover(image_url, timeout=10, cancel=None):
+    """Return the raw bytes of a cover image. Raises CoverNotFound."""
+    # Fix URLs that start with //
+    if image_url.startswith('//'):
+        image_url = 'https:' + image_url
+    return _get(image_url, IMAGE_HEADERS, timeout, cancel).content
+
+
+def scale_preview(image):
+    """Shrink a cover to fit the preview area; smaller images are left alone."""
+    if image.width() <= PREVIEW_SIZE and image.height() <= PREVIEW_SIZE:
+        return image
+    return image.scaled(PREVIEW_SIZE, PREVIEW_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+
+def encode_image(image):
+    """Compress a QImage for the disk cache, keeping transparency when it has any."""
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    if image.hasAlphaChannel():
+        image.save(buffer, "PNG")
+    else:
+        image.save(buffer, "JPG", 90)
+    return bytes(data)
+
+
+def _decode(data):
+    if not data:
+        return None
+    image = QImage.fromData(data)
+    return None if image.isNull() else image
+
+
+class _Ticket(threading.Event):
+    """Cancellation flag of one lookup in flight (set means cancelled)."""
+
+    def __init__(self, prefetch):
+        super().__init__()
+        self.prefetch = prefetch
+
+
+class _CoverSignals(QObject):
+    finished = pyqtSignal(str, object, object, str, str)  # title, ticket, QImage or None, image URL, error
+
+
+class _ImageSignals(QObject):
+    finished = pyqtSignal(str, object, str)  # image URL, QImage or None, error
+
+
+class _FullImageJob(QRunnable):
+    def __init__(self, signals, image_url, cache, width, height):
+        super().__init__()
+        self.signals = signals
+        self.image_url = image_url
+        self.cache = cache
+        self.width = width
+        self.height = height
+
+    def run(self):
+        try:
+            data = self.cache.original(self.image_url)
+            downloaded = data is None
+            if downloaded:
+                data = download_cover(self.image_url)
+            image = _decode(data)
+            if image is None:
+                raise CoverNotFound("Failed to load image")
+            if downloaded:
+                self.cache.store(self.image_url, data, encode_image(scale_preview(image)))
+            image = image.scaled(self.width, self.height, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        except Exception as e:
+            # Anything escaping run() on a pool thread aborts the whole app; the viewer shows the error instead
+            self.signals.finished.emit(self.image_url, None, f"Failed to fetch image: {e}")
+            return
+        self.signals.finished.emit(self.image_url, image, "")
+
+
+class _CoverJob(QRunnable):
+    def __init__(self, signals, title, api_key, cache, ticket):
+        super().__init__()
+        self.signals = signals
+        self.title = title
+        self.api_key = api_key
+        self.cache = cache
+        self.ticket = ticket
+
+    def run(self):
+        image, image_url, error = None, "", ""
+        try:
+            image_url, image = self.load()
+        except CoverCancelled:
+            image = None
+        except Exception as e:
+            # Anything escaping run() on a pool thread aborts the whole app, and finished
+            # must always come, or the ticket and its prefetch slot would never be released
+            image, error = None, str(e) or type(e).__name__
+        self.signals.finished.emit(self.title, self.ticket, image, image_url, error)
+
+    def load(self):
+        """Return (image URL, preview QImage), going to the network only for what is not cached."""
+        if self.ticket.is_set():
+            raise CoverCancelled()
+        cache = self.cache
+        image_url = cache.resolution(self.title).get("url")
+        if image_url:
+            image = _decode(cache.preview(image_url))
+            if image is not None:
+                return image_url, image
+        else:
+            image_url = self.resolve()
+
+        data = cache.original(image_url)
+        if data is None:
+            try:
+                data = download_cover(image_url, cancel=self.ticket)
+            except CoverNotFound:
+                # The image may have been taken off the CDN; look the title up again next time
+                cache.remember(self.title, url=None)
+                raise
+        # Decoded and scaled here so the GUI thread only has to wrap it in a QPixmap
+        image = _decode(data)
+        if image is None:
+            raise CoverNotFound("Failed to decode the cover image")
+        image = scale_preview(image)
+        cache.store(image_url, data, encode_image(image))
+        return image_url, image
+
+    def resolve(self):
+        """Find the title's image URL, skipping whatever steps earlier sessions already did."""
+        cache = self.cache
+        resolution = cache.resolution(self.title)
+        missing = resolution.get("missing")
+        if missing and time.time() - missing < MISSING_COVER_TTL:
+            raise CoverNotFound("No cover art on SteamGridDB")
+
+        game_id = resolution.get("game_id")
+        if game_id is None:
+            game_id = find_game_id(self.title, self.api_key, cancel=self.ticket)
+            if game_id is None:
+                cache.remember(self.title, missing=time.time())
+                raise CoverNotFound("No results found on SteamGridDB")
+            cache.remember(self.title, game_id=game_id)
+
+        image_url = find_grid_url(game_id, self.api_key, cancel=self.ticket)
+        if image_url is None:
+            cache.remember(self.title, missing=time.time())
+            raise CoverNotFound("No cover art found for this game")
+        cache.remember(self.title, url=image_url, missing=None)
+        return image_url
+
+
+class CoverLoader(QObject):
+    """Resolves and downloads SteamGridDB covers on a small thread pool.
+
+    Covers come from the disk cache whenever it has them. The selected title
+    is looked up straight away, ahead of anything queued. Titles passed to
+    prefetch() wait in a priority queue and at most PREFETCH_WORKERS of them
+    are looked up at once. Requests for a title already in flight are
+    coalesced, and a lookup for a title that is neither selected nor wanted
+    by the latest prefetch is cancelled: queued ones exit as soon as they
+    start, running ones stop before their next HTTP request, and their
+    results are never delivered.
+    """
+    cover_ready = pyqtSignal(str, object, str)  # title, QImage, image URL
+    cover_failed = pyqtSignal(str, str)  # title, error
+    full_image_ready = pyqtSignal(str, object, str)  # image URL, QImage scaled to fit or None, error
+
+    def __init__(self, api_key, parent=None, workers=COVER_WORKERS, cache=None):
+        super().__init__(parent)
+        self.api_key = api_key
+        self.cache = cache if cache is not None else CoverCache()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(workers)
+        self.tickets = {}  # title -> _Ticket of its lookup in flight
+        self.selected = None
+        self.wanted = {}  # title -> rank in the latest prefetch, lowest first
+        self.queue = []  # heap of (rank, title) waiting for a prefetch slot
+        self.prefetching = 0  # prefetch lookups still occupying a thread
+        self.signals = _CoverSignals()
+        self.signals.finished.connect(self.on_finished)
+        self.image_signals = _ImageSignals()
+        self.image_signals.finished.connect(self.full_image_ready)
+
+    def request(self, title):
+        """Load the selected title's cover ahead of any prefetch."""
+        self.selected = title
+        self._cancel_unwanted()
+        if title not in self.tickets:
+            self._start(title, prefetch=False)
+
+    def request_full(self, image_url, width, height):
+        """Load a cover at full size scaled to fit width x height, from disk when it was seen before.
+
+        The result arrives through full_image_ready; it jumps ahead of every
+        queued lookup since the user is waiting on it.
+        """
+        self.pool.start(_FullImageJob(self.image_signals, image_url, self.cache, width, height), 2)
+
+    def deselect(self):
+        """Stop loading the selected title's cover unless a prefetch still wants it."""
+        self.selected = None
+        self._cancel_unwanted()
+
+    def prefetch(self, titles):
+        """Warm the cache for titles, most wanted first, replacing the previous prefetch."""
+        self.wanted = {}
+        for rank, title in enumerate(titles):
+            self.wanted.setdefault(title, rank)
+        self._cancel_unwanted()
+        self.queue = [(rank, title) for title, rank in self.wanted.items() if title not in self.tickets]
+        heapq.heapify(self.queue)
+        self._dispatch()
+
+    def cancel(self):
+        """Cancel every lookup, selected or prefetched."""
+        self.selected = None
+        self.wanted = {}
+        self.queue = []
+        self._cancel_unwanted()
+
+    def _cancel_unwanted(self):
+        for title in list(self.tickets):
+            if title != self.selected and title not in self.wanted:
+                self.tickets.pop(title).set()
+
+    def _start(self, title, prefetch):
+        ticket = _Ticket(prefetch)
+        self.tickets[title] = ticket
+        if prefetch:
+            self.prefetching += 1
+        # Within the pool's own queue the selection also outranks prefetches
+        self.pool.start(_CoverJob(self.signals, title, self.api_key, self.cache, ticket), 0 if prefetch else 1)
+
+    def _dispatch(self):
+        while self.queue and self.prefetching < PREFETCH_WORKERS:
+            _, title = heapq.heappop(self.queue)
+            if title not in self.tickets:
+                self._start(title, prefetch=True)
+
+    def on_finished(self, title, ticket, image, image_url, error):
+        if self.tickets.get(title) is ticket:
+            del self.tickets[title]
+        if ticket.prefetch:
+            self.prefetching -= 1
+            self._dispatch()
+        if ticket.is_set():
+            return
+        if image is not None:
+            self.cover_ready.emit(title, image, image_url)
+        else:
+            self.cover_failed.emit(title, error)
@@ -0,0 +1,92 @@
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) seconds for any request that does not pass its own timeout
+DEFAULT_TIMEOUT = (5, 30)
+
+# Keep-alive connections kept open per host, and hosts with a pool of their own
+POOL_SIZE = 8
+POOL_HOSTS = 16
+
+# Connection errors and these answers are retried with exponential backoff
+# (BACKOFF_FACTOR * 2 ** attempt seconds, or whatever Retry-After asks for)
+RETRIES = 3
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_stats_lock = threading.Lock()
+_stats = {}  # host -> {"requests": count, "bytes": count}
+_session = None
+_session_lock = threading.Lock()
+
+
+def _record(host, requests_made=0, byte_count=0):
+    with _stats_lock:
+        stats = _stats.setdefault(host, {"requests": 0, "bytes": 0})
+        stats["requests"] += requests_made
+        stats["bytes"] += byte_count
+
+
+def host_stats():
+    """Requests made and bytes received so far, per host: {host: {"requests": n, "bytes": n}}."""
+    with _stats_lock:
+        return {host: dict(stats) for host, stats in _stats.items()}
+
+
+def _count_body(response, host):
+    # Every body, streamed or not, is read through iter_content; raw.tell() is
+    # what actually came over the wire, before gzip decoding
+    iter_content = response.iter_content
+    raw = response.raw
+
+    def counted(*args, **kwargs):
+        seen = 0
+        for chunk in iter_content(*args, **kwargs):
+            received = raw.tell()
+            _record(host, byte_count=received - seen)
+            seen = received
+            yield chunk
+        _record(host, byte_count=raw.tell() - seen)
+
+    response.iter_content = counted
+
+
+class _Adapter(HTTPAdapter):
+    """Pooled, retrying adapter that applies the default timeout and keeps the counters."""
+
+    def send(self, request, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = DEFAULT_TIMEOUT
+        return super().send(request, timeout=timeout, **kwargs)
+
+    def build_response(self, req, resp):
+        response = super().build_response(req, resp)
+        host = urlsplit(req.url).hostname or ""
+        _record(host, requests_made=1)
+        _count_body(response, host)
+        return response
+
+
+def session():
+    """The process-wide requests.Session every Feather download goes through."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(total=RETRIES, backoff_factor=BACKOFF_FACTOR,
+                          status_forcelist=RETRY_STATUSES, allowed_methods=("GET", "HEAD"),
+                          raise_on_status=False)
+            adapter = _Adapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_SIZE, max_retries=retry)
+            new_session = requests.Session()
+            new_session.mount("http://", adapter)
+            new_session.mount("https://", adapter)
+            new_session.headers["Accept-Encoding"] = "gzip, deflate"
+            _session = new_session
+        return _session
+
+
+def get(url, **kwargs):
+    """requests.get over the shared session; without a timeout, DEFAULT_TIMEOUT applies."""
+    return session().get(url, **kwargs)
@@ -0,0 +1,269 @@
+from PyQt5.QtWidgets import QWidget, QHBoxLayout, QComboBox
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from collections import OrderedDict
+from feather_search import normalize
+from feather_catalog import SORT_ORDERS
+from feather_query import exact_matches, closest_matches, QuerySyntaxError
+
+# Quiet time after the last keystroke before a search starts
+SEARCH_DELAY_MS = 250
+
+# Choices of the sort and size boxes: label -> SORT_ORDERS name, and label -> most bytes
+SORT_CHOICES = (("Best match", None), ("Newest first", "newest"), ("Oldest first", "oldest"),
+                ("Largest first", "largest"), ("Smallest first", "smallest"))
+SIZE_CHOICES = (("Any size", None), ("Under 1 GB", 1 << 30), ("Under 5 GB", 5 << 30),
+                ("Under 20 GB", 20 << 30), ("Under 50 GB", 50 << 30))
+
+# Default memory budget for decoded cover previews
+PIXMAP_CACHE_BYTES = 32 * 1024 * 1024
+
+
+class _SearchSignals(QObject):
+    finished = pyqtSignal(int, object, str, object, bool)  # generation, index, query, results, fuzzy
+
+
+class _SearchJob(QRunnable):
+    def __init__(self, signals, generation, catalog, index, query, previous):
+        super().__init__()
+        self.signals = signals
+        self.generation = generation
+        self.catalog = catalog
+        self.index = index
+        self.query = query
+        self.previous = previous
+
+    def run(self):
+        if not self.query:
+            results, fuzzy = self.catalog.live(range(len(self.index))), False
+        else:
+            try:
+                results = exact_matches(self.catalog, self.index, self.query, self.previous)
+                fuzzy = not results
+                if fuzzy:
+                    results = closest_matches(self.catalog, self.index, self.query)
+            except QuerySyntaxError:
+                results, fuzzy = [], False
+        self.signals.finished.emit(self.generation, self.index, self.query, results, fuzzy)
+
+
+class LiveSearch(QObject):
+    """Search-as-you-type for a QLineEdit over a catalog and its SubstringIndex.
+
+    Keystrokes are debounced, the search itself runs on a worker thread, and a
+    query that extends the previous one filters the previous results instead
+    of going back to the index. Only the answer to the newest query is
+    delivered through results_ready(query, catalog indices, fuzzy). Queries
+    use the feather_query syntax; one that cannot be parsed finds nothing.
+    """
+    results_ready = pyqtSignal(str, object, bool)
+
+    def __init__(self, line_edit, delay=SEARCH_DELAY_MS, parent=None):
+        super().__init__(parent or line_edit)
+        self.line_edit = line_edit
+        self.catalog = None
+        self.index = None
+        self.generation = 0
+        self.awaited = None  # generation of the search whose answer is still to come
+        self.previous = None  # (index, query, results) of the last exact answer
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.start_search)
+
+        # One worker is enough: a newer query always supersedes the one queued before it
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.signals = _SearchSignals(self)
+        self.signals.finished.connect(self.on_finished)
+
+        line_edit.textChanged.connect(self.schedule)
+        line_edit.returnPressed.connect(self.flush)
+
+    def set_index(self, index, catalog):
+        """Search index and catalog from now on; also after either was changed in place.
+
+        A search still running on the old data is dropped and run again on
+        the new, and the previous answer is forgotten: both may lack entries
+        added since. One still waiting for the typing pause will see the new data.
+        """
+        self.index = index
+        self.catalog = catalog
+        self.generation += 1
+        self.previous = None
+        if self.awaited is not None:
+            self.start_search()
+
+    def schedule(self):
+        self.timer.start()
+
+    def flush(self):
+        """Search right away, e.g. when Enter is pressed."""
+        self.timer.stop()
+        self.start_search()
+
+    def start_search(self):
+        if self.index is None:
+            return
+        self.generation += 1
+        self.pool.clear()
+        self.awaited = self.generation
+        query = self.line_edit.text().strip()
+        self.pool.start(_SearchJob(self.signals, self.generation, self.catalog, self.index, query, self.previous))
+
+    def on_finished(self, generation, index, query, results, fuzzy):
+        if generation != self.generation:
+            return
+        self.awaited = None
+        if query and not fuzzy:
+            self.previous = (index, normalize(query), results)
+        self.results_ready.emit(query, results, fuzzy)
+
+
+class GameListModel(QAbstractListModel):
+    """List model whose rows are catalog indices.
+
+    Nothing is copied per row: a QListView asks for the label of a row only
+    when it paints it, and showing a new result set just swaps the indices.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.catalog = None
+        self.indices = ()
+
+    def set_rows(self, catalog, indices):
+        self.beginResetModel()
+        self.catalog = catalog
+        self.indices = indices
+        self.endResetModel()
+
+    def update_rows(self, indices):
+        """Switch to indices by removing and inserting rows rather than resetting the model.
+
+        Rows kept must keep their order; the view then holds on to its
+        selection and scroll position. Otherwise this is set_rows().
+        """
+        kept = set(indices)
+        rows = list(self.indices)
+        present = {index for index in rows if index in kept}
+        if [index for index in rows if index in kept] != [index for index in indices if index in present]:
+            self.set_rows(self.catalog, indices)
+            return
+        # Runs of removed rows, last first so the row numbers of the others stay valid
+        end = len(rows)
+        while end > 0:
+            if rows[end - 1] in kept:
+                end -= 1
+                continue
+            start = end - 1
+            while start > 0 and rows[start - 1] not in kept:
+                start -= 1
+            self.beginRemoveRows(QModelIndex(), start, end - 1)
+            del rows[start:end]
+            self.indices = rows
+            self.endRemoveRows()
+            end = start
+        # Runs of inserted rows, first first, each at its final row number
+        start = 0
+        while start < len(indices):
+            if indices[start] in present:
+                start += 1
+                continue
+            end = start + 1
+            while end < len(indices) and indices[end] not in present:
+                end += 1
+            self.beginInsertRows(QModelIndex(), start, end - 1)
+            rows[start:start] = indices[start:end]
+            self.indices = rows
+            self.endInsertRows()
+            start = end
+        self.indices = indices
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.catalog is None:
+            return 0
+        return len(self.indices)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self.catalog.label(self.indices[index.row()])
+        return None
+
+    def catalog_index(self, row):
+        """Catalog index shown at row, or None if the row does not exist."""
+        if 0 <= row < self.rowCount():
+            return self.indices[row]
+        return None
+
+
+class ListControls(QWidget):
+    """Sort and size boxes for a game list; changed fires whenever either is switched."""
+    changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.sort_box = QComboBox(self)
+        for label, name in SORT_CHOICES:
+            self.sort_box.addItem(label, name)
+        self.size_box = QComboBox(self)
+        for label, limit in SIZE_CHOICES:
+            self.size_box.addItem(label, limit)
+        layout.addWidget(self.sort_box)
+        layout.addWidget(self.size_box)
+        layout.addStretch(1)
+        self.sort_box.currentIndexChanged.connect(self.changed)
+        self.size_box.currentIndexChanged.connect(self.changed)
+
+    def arrange(self, catalog, indices):
+        """Indices as they should be listed; answered from the catalog's sorted indexes."""
+        name = self.sort_box.currentData()
+        sort, descending = SORT_ORDERS[name] if name else (None, False)
+        limit = self.size_box.currentData()
+        ranges = {"size": (None, limit)} if limit else None
+        if not sort and not ranges:
+            return indices
+        return catalog.arrange(indices, sort, descending, ranges)
+
+
+class PixmapCache:
+    """Least recently used pixmaps, bounded by their decoded size in bytes.
+
+    Each entry is a pixmap plus whatever the caller stores with it. An entry
+    costs width * height * depth / 8, so a few large images cannot hide
+    behind a small item count.
+    """
+
+    def __init__(self, max_bytes=PIXMAP_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.total = 0
+        self.entries = OrderedDict()  # key -> (pixmap, extra, cost), oldest first
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Return (pixmap, extra) for key and mark it used, or None."""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.entries.move_to_end(key)
+        return entry[0], entry[1]
+
+    def put(self, key, pixmap, extra=None):
+        cost = pixmap.width() * pixmap.height() * pixmap.depth() // 8
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.total -= old[2]
+        if cost > self.max_bytes:
+            return
+        self.entries[key] = (pixmap, extra, cost)
+        self.total += cost
+        while self.total > self.max_bytes:
+            _, (_, _, evicted_cost) = self.entries.popitem(last=False)
+            self.total -= evicted_cost
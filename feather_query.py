@@ -0,0 +1,259 @@
+import re
+import bisect
+import calendar
+from datetime import datetime, timezone
+from feather_catalog import parse_size
+from feather_search import NGRAM, normalize, narrowing_search
+
+# One term: an optional "-" negation, an optional known field, then a "quoted phrase" or a word
+_TERM_RE = re.compile(r'(-?)(?:(size|date|source):)?("[^"]*"?|\S+)', re.IGNORECASE)
+# Comparison at the start of a size or date value, or a low..high range
+_COMPARISON_RE = re.compile(r"^(<=|>=|<|>|=)?(.*)$")
+_BARE_NUMBER_RE = re.compile(r"^\d+(?:[.,]\d+)?$")
+_DATE_RE = re.compile(r"^(\d{4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?$")
+
+# Fuzzy matches scored before the other terms of a query filter them
+FUZZY_FILTER_POOL = 500
+
+# Shown as the tooltip of search fields
+QUERY_HELP = ("Search by title, or narrow it down, e.g. witcher size:<30GB date:>2024-01 source:gog -demo\n"
+              "size: and date: take <, <=, >, >= or a low..high range; source: matches part of a source URL;\n"
+              "\"quoted words\" must appear together, and a leading - excludes what a term matches.")
+
+
+class QuerySyntaxError(ValueError):
+    """A size, date or source term that cannot be understood."""
+
+
+class _Text:
+    """Entries whose search key contains a phrase; driven by the trigram index."""
+
+    def __init__(self, phrase, negated=False):
+        self.phrase = normalize(phrase)
+        self.negated = negated
+
+    def estimate(self, catalog, index):
+        if len(self.phrase) < NGRAM:
+            return len(index)
+        return len(index.candidates(self.phrase))
+
+    def ids(self, catalog, index):
+        return catalog.live(index.search(self.phrase))
+
+    def test(self, catalog, index):
+        phrase, keys = self.phrase, index.keys
+        return lambda entry: phrase in keys[entry]
+
+
+class _Range:
+    """Entries whose size or date lies in [low, high]; driven by the catalog's sorted index."""
+
+    def __init__(self, field, low, high, negated=False):
+        self.field = field
+        self.low = low
+        self.high = high
+        self.negated = negated
+
+    def estimate(self, catalog, index):
+        return catalog.count_between(self.field, self.low, self.high)
+
+    def ids(self, catalog, index):
+        return sorted(catalog.between(self.field, self.low, self.high))
+
+    def test(self, catalog, index):
+        column = catalog.column(self.field)
+        low = 0 if self.low is None else self.low
+        high = self.high
+        if high is None:
+            return lambda entry: column[entry] >= low
+        return lambda entry: low <= column[entry] <= high
+
+
+class _Source:
+    """Entries listed by a source whose URL contains some text; driven by per-source entry lists."""
+
+    def __init__(self, text, negated=False):
+        self.text = text.lower()
+        self.negated = negated
+
+    def matching(self, catalog):
+        return {source_id for source_id, url in enumerate(catalog.sources) if self.text in url.lower()}
+
+    def estimate(self, catalog, index):
+        postings = catalog.source_entries()
+        return sum(len(postings[source_id]) for source_id in self.matching(catalog))
+
+    def ids(self, catalog, index):
+        postings = catalog.source_entries()
+        matching = sorted(self.matching(catalog))
+        if len(matching) == 1:
+            return postings[matching[0]]
+        return sorted({entry for source_id in matching for entry in postings[source_id]})
+
+    def test(self, catalog, index):
+        matching = self.matching(catalog)
+        return lambda entry: not matching.isdisjoint(catalog.entry_sources(entry))
+
+
+def _negate(test):
+    return lambda entry: not test(entry)
+
+
+class Query:
+    """A parsed query: what each matching entry must (or must not) satisfy."""
+
+    def __init__(self, text, predicates, phrase):
+        self.text = text
+        self.predicates = predicates
+        # Free words in order, the part a fuzzy search can look for
+        self.phrase = phrase
+
+    @property
+    def plain(self):
+        """True when the query is nothing but free words, searched exactly as typed."""
+        return len(self.predicates) == (1 if self.phrase else 0)
+
+    def plan(self, catalog, index):
+        """(driver, filters): the most selective positive term and the rest, most selective first.
+
+        The driver is answered by its index; the filters are then checked on
+        its results only, so a compound query costs about as much as its
+        cheapest term. With no positive term every entry is a candidate.
+        """
+        estimated = sorted(self.predicates, key=lambda predicate: predicate.estimate(catalog, index))
+        driver = next((predicate for predicate in estimated if not predicate.negated), None)
+        return driver, [predicate for predicate in estimated if predicate is not driver]
+
+    def run(self, catalog, index, candidates=None):
+        """Ascending indices of every entry matching the query; with candidates, those that match, in order."""
+        driver, filters = self.plan(catalog, index)
+        count = len(index)
+        if candidates is None and driver is None:
+            candidates = catalog.live(range(count))
+        elif candidates is None:
+            candidates = driver.ids(catalog, index)
+            # A catalog still loading can be ahead of its index; its newest entries are not searchable yet
+            if candidates and candidates[-1] >= count:
+                candidates = candidates[:bisect.bisect_left(candidates, count)]
+        elif driver is not None:
+            filters.insert(0, driver)
+        tests = [predicate.test(catalog, index) for predicate in filters]
+        tests = [_negate(test) if predicate.negated else test for predicate, test in zip(filters, tests)]
+        if not tests:
+            return list(candidates)
+        if len(tests) == 1:
+            return [entry for entry in candidates if tests[0](entry)]
+        return [entry for entry in candidates if all(test(entry) for test in tests)]
+
+
+def _size_bound(text):
+    # A bare number means gigabytes, as in every size limit Feather asks for
+    if _BARE_NUMBER_RE.match(text):
+        text += "GB"
+    value = parse_size(text)
+    if value is None:
+        raise QuerySyntaxError(f"Not a size: {text!r}")
+    return value, value
+
+
+def _date_bound(text):
+    # A year, month or day stands for the whole period: (its first second, its last second)
+    match = _DATE_RE.match(text)
+    if match is None:
+        raise QuerySyntaxError(f"Not a date (YYYY, YYYY-MM or YYYY-MM-DD): {text!r}")
+    year, month, day = int(match.group(1)), match.group(2), match.group(3)
+    try:
+        if day is not None:
+            start = datetime(year, int(month), int(day), tzinfo=timezone.utc)
+            days = 1
+        elif month is not None:
+            start = datetime(year, int(month), 1, tzinfo=timezone.utc)
+            days = calendar.monthrange(year, int(month))[1]
+        else:
+            start = datetime(year, 1, 1, tzinfo=timezone.utc)
+            days = 366 if calendar.isleap(year) else 365
+    except ValueError as e:
+        raise QuerySyntaxError(f"Not a date: {text!r} ({e})") from None
+    first = int(start.timestamp())
+    return first, first + days * 86400 - 1
+
+
+def _range(field, value, negated):
+    bound = _size_bound if field == "size" else _date_bound
+    if ".." in value:
+        low_text, high_text = value.split("..", 1)
+        low = bound(low_text)[0] if low_text else None
+        high = bound(high_text)[1] if high_text else None
+        return _Range(field, low, high, negated)
+    operator, value = _COMPARISON_RE.match(value).groups()
+    first, last = bound(value)
+    if operator == "<":
+        return _Range(field, None, first - 1, negated)
+    if operator == "<=":
+        return _Range(field, None, last, negated)
+    if operator == ">":
+        return _Range(field, last + 1, None, negated)
+    if operator == ">=":
+        return _Range(field, first, None, negated)
+    return _Range(field, first, last, negated)
+
+
+def parse_query(text):
+    """Parse a search such as `witcher size:<30GB date:>2024-01 source:gog -demo`.
+
+    Free words together form one phrase the title must contain, just like a
+    plain search; a "quoted phrase" must appear as well. size: and date: take
+    a value with an optional <, <=, >, >= or =, or a low..high range; sizes
+    without a unit are in GB, and a date is a year, month or day meaning the
+    whole period. source: matches part of a source URL. A leading - excludes
+    whatever the term matches. Raises QuerySyntaxError.
+    """
+    predicates = []
+    words = []
+    for match in _TERM_RE.finditer(text):
+        negated, field, value = match.group(1) == "-", match.group(2), match.group(3)
+        quoted = value.startswith('"')
+        if quoted:
+            value = value.strip('"')
+        if not value:
+            continue
+        if field is None:
+            if negated or quoted:
+                predicates.append(_Text(value, negated))
+            else:
+                words.append(value)
+        elif field.lower() == "source":
+            predicates.append(_Source(value, negated))
+        else:
+            predicates.append(_range(field.lower(), value, negated))
+    phrase = " ".join(words)
+    if phrase:
+        predicates.insert(0, _Text(phrase))
+    return Query(text, predicates, phrase)
+
+
+def exact_matches(catalog, index, text, previous=None):
+    """Ascending catalog indices matching a query; plain text is a substring search as before.
+
+    previous is the (index, query, results) of the last plain search, see
+    narrowing_search(). Raises QuerySyntaxError.
+    """
+    query = parse_query(text)
+    if query.plain:
+        if previous is not None and not parse_query(previous[1]).plain:
+            previous = None
+        return catalog.live(narrowing_search(index, text, previous))
+    return query.run(catalog, index)
+
+
+def closest_matches(catalog, index, text, limit=50):
+    """Closest matches to a query's free words, best first, that meet all its other terms."""
+    query = parse_query(text)
+    if not query.phrase:
+        return []
+    if query.plain:
+        # Retired entries are still in the index; ask for enough to make up for them
+        return catalog.live(index.fuzzy(text, limit + len(catalog.retired)))[:limit]
+    # The phrase is always the first predicate; the rest filter its ranked matches
+    others = Query(text, query.predicates[1:], "")
+    return others.run(catalog, index, catalog.live(index.fuzzy(query.phrase, FUZZY_FILTER_POOL)))[:limit]
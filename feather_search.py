@@ -0,0 +1,239 @@
+import re
+import heapq
+import unicodedata
+from array import array
+from collections import Counter
+from difflib import SequenceMatcher
+
+# Length of the substrings the index is keyed on
+NGRAM = 3
+
+# Fuzzy search: how many prefiltered candidates get a full similarity score
+FUZZY_CANDIDATES = 600
+# Grams present in more than this share of keys are skipped while counting
+FUZZY_STOP_FRACTION = 0.2
+# Results scoring below this are not worth showing
+FUZZY_MIN_SCORE = 0.6
+
+# Words, with runs of letters and digits split apart ("witcher3" -> "witcher", "3")
+_TOKEN_RE = re.compile(r"\d+|[^\W\d_]+")
+# First letter of every letter run, i.e. the initials of tokenize()'s word tokens
+_INITIAL_RE = re.compile(r"(?<![^\W\d_])[^\W\d_]")
+
+
+def ngrams(text):
+    """Distinct NGRAM-length substrings of text."""
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+
+def normalize(text):
+    """Search form of text: casefolded, with accents and other combining marks removed."""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    if decomposed.isascii():
+        return decomposed
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text):
+    """Normalized word tokens of text."""
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def _initials(text):
+    return "".join(_INITIAL_RE.findall(text))
+
+
+class SubstringIndex:
+    """Trigram inverted index answering `query in key` for a list of normalized keys.
+
+    Each trigram maps to the ascending ids of the keys containing it. Every
+    match must appear in the posting list of each of the query's trigrams, so
+    a query only walks the shortest of those lists and verifies each candidate
+    with a real `in` check; the result is always identical to a linear scan.
+    (Hashing further lists to intersect them costs more than the C-level
+    substring check it would save.)
+
+    Fuzzy matches are ranked on word tokens; pass tokens (parallel to keys,
+    e.g. Catalog.tokens) when they were already computed at ingest.
+    """
+
+    def __init__(self, keys=(), tokens=None):
+        self.keys = []
+        self.tokens = []  # word tokens per key, for ranking fuzzy matches
+        self.postings = {}
+        self.acronyms = None  # initials prefix -> ids, built on the first fuzzy search
+        if tokens is None:
+            for key in keys:
+                self.add(key)
+        else:
+            for key, key_tokens in zip(keys, tokens):
+                self.add(key, key_tokens)
+
+    @classmethod
+    def from_postings(cls, keys, tokens, postings):
+        """An index over keys whose posting lists were built earlier, e.g. read from a snapshot.
+
+        Postings may be read-only views; one is copied the first time add() extends it.
+        """
+        index = cls()
+        index.keys = list(keys)
+        index.tokens = list(tokens)
+        index.postings = postings
+        return index
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key, tokens=None):
+        """Index the next key; its id is its position in self.keys."""
+        key_id = len(self.keys)
+        self.tokens.append(tuple(tokenize(key)) if tokens is None else tokens)
+        self.keys.append(key)
+        if self.acronyms is not None:
+            _add_acronym(self.acronyms, key_id, key)
+        postings = self.postings
+        for gram in ngrams(key):
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = array('I', (key_id,))
+            elif isinstance(posting, array):
+                posting.append(key_id)
+            else:
+                postings[gram] = array('I', posting)
+                postings[gram].append(key_id)
+
+    def candidates(self, query):
+        """Ascending ids that may contain query; a superset of the answer."""
+        shortest = None
+        for gram in ngrams(query):
+            posting = self.postings.get(gram)
+            if posting is None:
+                return ()
+            if shortest is None or len(posting) < len(shortest):
+                shortest = posting
+        return shortest
+
+    def search(self, query):
+        """Ascending ids of every key that contains query."""
+        query = normalize(query)
+        keys = self.keys
+        if len(query) < NGRAM:
+            return [key_id for key_id, key in enumerate(keys) if query in key]
+        return [key_id for key_id in self.candidates(query) if query in keys[key_id]]
+
+    def fuzzy(self, query, limit=50):
+        """Ids of the best matches for query, best first, tolerating typos and word order.
+
+        Candidates are prefiltered by how many of the query's trigrams they
+        share (plus an acronym lookup, so "gta" finds "Grand Theft Auto"). Only
+        those are scored, and a bounded heap keeps the best `limit` of them.
+        """
+        query_tokens = tokenize(query)
+        if not query_tokens or not self.keys:
+            return []
+        candidates = self._fuzzy_candidates(query_tokens)
+        tokens = self.tokens
+        similarity = {}
+        scored = []
+        for key_id in candidates:
+            score = self._score(query_tokens, tokens[key_id], similarity)
+            if score >= FUZZY_MIN_SCORE:
+                scored.append((score, -key_id))
+        return [-neg_id for score, neg_id in heapq.nlargest(limit, scored)]
+
+    def _fuzzy_candidates(self, query_tokens):
+        counts = Counter()
+        grams = set()
+        for token in query_tokens:
+            grams.update(ngrams(token))
+        posting_lists = sorted((self.postings[gram] for gram in grams if gram in self.postings), key=len)
+        stop_length = FUZZY_STOP_FRACTION * len(self.keys)
+        for number, posting in enumerate(posting_lists):
+            # Very common grams say little about a match; keep them only if nothing rarer exists
+            if number and len(posting) > stop_length:
+                break
+            counts.update(posting)
+
+        acronyms = self._acronym_index()
+        bonus = len(posting_lists) or 1
+        lookups = [token for token in query_tokens if token.isalpha() and 2 <= len(token) <= 5]
+        joined = "".join(query_tokens)
+        if len(query_tokens) > 1 and joined.isalpha() and len(joined) <= 5:
+            lookups.append(joined)
+        for token in lookups:
+            for key_id in acronyms.get(token, ()):
+                counts[key_id] += bonus
+        return [key_id for key_id, hits in counts.most_common(FUZZY_CANDIDATES)]
+
+    def _acronym_index(self):
+        if self.acronyms is None:
+            acronyms = {}
+            for key_id, key in enumerate(self.keys):
+                _add_acronym(acronyms, key_id, key)
+            # Published only once complete, as searches may run on another thread
+            self.acronyms = acronyms
+        return self.acronyms
+
+    def _score(self, query_tokens, key_tokens, similarity):
+        """Mean best-match similarity of each query token against the key's tokens."""
+        if not key_tokens:
+            return 0.0
+        initials = "".join(token[0] for token in key_tokens if not token.isdigit())
+        total = 0.0
+        for token in query_tokens:
+            best = 0.0
+            for key_token in key_tokens:
+                pair = (token, key_token)
+                value = similarity.get(pair)
+                if value is None:
+                    value = similarity[pair] = _token_similarity(token, key_token)
+                if value > best:
+                    best = value
+                    if best == 1.0:
+                        break
+            if best < 0.9 and token.isalpha() and len(token) >= 2 and initials.startswith(token):
+                best = 0.9
+            total += best
+        score = total / len(query_tokens)
+        # Prefer titles that say little beyond the query
+        extra = max(0, len(key_tokens) - len(query_tokens))
+        return score - 0.01 * min(extra, 10)
+
+
+def _add_acronym(acronyms, key_id, key):
+    initials = _initials(key)
+    for length in range(2, min(len(initials), 5) + 1):
+        acronyms.setdefault(initials[:length], []).append(key_id)
+
+
+def narrowing_search(index, query, previous=None):
+    """Exact search that reuses the previous answer when the query only grew.
+
+    previous is the (index, query, results) of an earlier exact search. Any key
+    containing the new query also contains a substring of it, so when the old
+    query is part of the new one its results can simply be filtered, which is
+    cheaper than the index whenever they are fewer than the index candidates.
+    """
+    query = normalize(query)
+    if previous is not None:
+        previous_index, previous_query, previous_results = previous
+        if previous_index is index and previous_query in query:
+            if len(query) < NGRAM or len(previous_results) <= len(index.candidates(query)):
+                keys = index.keys
+                return [key_id for key_id in previous_results if query in keys[key_id]]
+    return index.search(query)
+
+
+def _token_similarity(token, key_token):
+    if token == key_token:
+        return 1.0
+    if len(token) >= 2 and key_token.startswith(token):
+        return 0.9
+    if token.isdigit() or key_token.isdigit():
+        return 0.0
+    matcher = SequenceMatcher(None, token, key_token)
+    if matcher.real_quick_ratio() < FUZZY_MIN_SCORE or matcher.quick_ratio() < FUZZY_MIN_SCORE:
+        return 0.0
+    return matcher.ratio()
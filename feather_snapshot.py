@@ -0,0 +1,272 @@
+import os
+import sys
+import mmap
+import json
+import bisect
+import struct
+from array import array
+from feather_cache import cache_dir, atomic_write
+from feather_catalog import Catalog
+from feather_search import SubstringIndex
+
+# Bump whenever the layout or the meaning of any section changes; older files are then ignored
+SNAPSHOT_VERSION = 4
+
+_MAGIC = b"FEATHER\x00"
+# Magic, version, header length; the JSON header follows, then the 8-byte aligned sections
+_PRELUDE = struct.Struct("<8sII")
+_ALIGN = 8
+
+# Catalog columns holding one string per entry, and those holding a tuple of strings
+_STRING_COLUMNS = ("titles", "names", "keys", "name_keys", "sizes", "dates")
+_TUPLE_COLUMNS = ("tokens", "uris")
+_NUMERIC_COLUMNS = ("size_bytes", "timestamps", "source_ids")
+_SORTED_FIELDS = ("size", "date")
+
+
+def snapshot_path():
+    return os.path.join(cache_dir(), "catalog.snapshot")
+
+
+def source_hashes(urls, cache):
+    """Content hash of every source's cached body, in urls order (None when it has none)."""
+    return [cache.content_hash(url) for url in urls]
+
+
+def result_hashes(results):
+    """Content hash of the body behind every result, in order (None for a source that gave nothing)."""
+    return [result.sha256 if result else None for result in results]
+
+
+class _Writer:
+    """Collects the sections of a snapshot and the distinct strings they refer to."""
+
+    def __init__(self):
+        self.strings = {}
+        self.sections = []
+
+    def ids(self, values):
+        strings = self.strings
+        return array('I', [strings.setdefault(value, len(strings)) for value in values])
+
+    def add(self, name, values):
+        self.sections.append((name, values))
+
+    def add_tuples(self, name, tuples):
+        # Each distinct tuple once, flattened (offsets[i]:offsets[i + 1] are the items of
+        # tuple i), plus the tuple id of every row; entries repeat their tokens and URIs a lot
+        distinct = {}
+        rows = array('I', [distinct.setdefault(items, len(distinct)) for items in tuples])
+        offsets = array('I', [0])
+        flat = []
+        for items in distinct:
+            flat.extend(items)
+            offsets.append(len(flat))
+        self.add(name + "_rows", rows)
+        self.add(name + "_offsets", offsets)
+        self.add(name, self.ids(flat))
+
+    def add_catalog(self, catalog):
+        """Add the columns, merged origins and retired entries of catalog; returns how many entries they hold."""
+        count = len(catalog)
+        retired = catalog.retired
+        for name in _STRING_COLUMNS:
+            self.add(name, self.ids(getattr(catalog, name)[:count]))
+        for name in _TUPLE_COLUMNS:
+            self.add_tuples(name, getattr(catalog, name)[:count])
+        for name in _NUMERIC_COLUMNS:
+            self.add(name, array(getattr(catalog, name).typecode, getattr(catalog, name)[:count]))
+
+        # Entries merging several source entries: origin_offsets delimit each one's members
+        merged = sorted(catalog.merged_origins().items())
+        origin_offsets = array('I', [0])
+        members = []
+        for _, origins in merged:
+            members.extend(origins)
+            origin_offsets.append(len(members))
+        self.add("origin_rows", array('I', [row for row, _ in merged]))
+        self.add("origin_offsets", origin_offsets)
+        self.add("origin_sources", array('H', [source_id for source_id, _, _ in members]))
+        self.add_tuples("origin_uris", [uris for _, uris, _ in members])
+        self.add("origin_keys", self.ids([key for _, _, key in members]))
+        self.add("retired", array('I', sorted(index for index in retired if index < count)))
+        return count
+
+    def encode(self, header):
+        # The string table goes last, once every section has added to it
+        offsets = array('I', [0])
+        length = 0
+        for value in self.strings:
+            length += len(value)
+            offsets.append(length)
+        self.add("string_offsets", offsets)
+        self.add("strings", array('B', "".join(self.strings).encode("utf-8")))
+
+        layout = {}
+        position = 0
+        for name, values in self.sections:
+            size = len(values) * values.itemsize
+            layout[name] = [position, size, values.typecode]
+            position += size + (-size % _ALIGN)
+        header = dict(header, sections=layout, byteorder=sys.byteorder,
+                      itemsizes={code: array(code).itemsize for code in "BHIq"})
+        header_bytes = json.dumps(header).encode("utf-8")
+        header_bytes += b" " * (-(_PRELUDE.size + len(header_bytes)) % _ALIGN)
+
+        parts = [_PRELUDE.pack(_MAGIC, SNAPSHOT_VERSION, len(header_bytes)), header_bytes]
+        for name, values in self.sections:
+            data = values.tobytes()
+            parts.append(data)
+            parts.append(b"\0" * (-len(data) % _ALIGN))
+        return b"".join(parts)
+
+
+def save_snapshot(urls, hashes, catalog, index=None, index_column="name_keys", path=None):
+    """Write catalog, and index when given (built over catalog.<index_column>), for the sources at urls.
+
+    hashes are the content hashes of the bodies the catalog was built from,
+    see result_hashes(); the snapshot is only ever loaded for those same bodies.
+    """
+    writer = _Writer()
+    # Entries a refresh appends while this runs are left for the next snapshot
+    count = writer.add_catalog(catalog)
+    for field in _SORTED_FIELDS:
+        order = catalog.sorted_by(field)
+        if len(catalog) != count:
+            order = array('I', [entry for entry in order if entry < count])
+        writer.add("order_" + field, array('I', order))
+
+    if index is not None:
+        grams = list(index.postings)
+        writer.add("grams", writer.ids(grams))
+        offsets = array('I', [0])
+        postings = array('I')
+        for gram in grams:
+            posting = index.postings[gram]
+            if posting and posting[-1] >= count:
+                posting = posting[:bisect.bisect_left(posting, count)]
+            postings.extend(posting)
+            offsets.append(len(postings))
+        writer.add("posting_offsets", offsets)
+        writer.add("postings", postings)
+
+    header = {"urls": list(urls), "hashes": list(hashes), "entries": count,
+              "sources": list(catalog.sources), "index": index_column if index is not None else None}
+    try:
+        atomic_write(path or snapshot_path(), writer.encode(header))
+    except OSError as e:
+        # e.g. Windows refusing to replace a snapshot that is still mapped
+        print(f"Could not save the catalog snapshot: {e}")
+
+
+def pack_catalog(catalog):
+    """catalog as one compact bytes object, e.g. to hand it to another process; see unpack_catalog()."""
+    writer = _Writer()
+    count = writer.add_catalog(catalog)
+    return writer.encode({"entries": count, "sources": list(catalog.sources)})
+
+
+def unpack_catalog(data):
+    """The Catalog that pack_catalog() turned into data, on this same machine."""
+    view = memoryview(data)
+    start, header = _parse(view)
+    if header is None:
+        raise ValueError("Not a packed catalog")
+    return _Reader(view, start, header).catalog()
+
+
+def _parse(view):
+    if len(view) < _PRELUDE.size:
+        return None, None
+    magic, version, header_length = _PRELUDE.unpack_from(view)
+    if magic != _MAGIC or version != SNAPSHOT_VERSION:
+        return None, None
+    start = _PRELUDE.size + header_length
+    return start, json.loads(bytes(view[_PRELUDE.size:start]))
+
+
+def _open(path):
+    with open(path, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    return (view,) + _parse(view)
+
+
+def _copy(view):
+    values = array(view.format)
+    values.frombytes(view.cast("B"))
+    return values
+
+
+class _Reader:
+    """Sections of an encoded snapshot, with the strings they refer to decoded once."""
+
+    def __init__(self, view, start, header):
+        self.view = view
+        self.start = start
+        self.header = header
+        text = bytes(self.section("strings")).decode("utf-8")
+        self.strings = [text[low:high] for low, high in self.bounds("string_offsets")]
+
+    def section(self, name):
+        offset, size, typecode = self.header["sections"][name]
+        return self.view[self.start + offset:self.start + offset + size].cast(typecode)
+
+    def bounds(self, name):
+        offsets = self.section(name).tolist()
+        return zip(offsets[:-1], offsets[1:])
+
+    def lookup(self, name):
+        return list(map(self.strings.__getitem__, self.section(name).tolist()))
+
+    def tuples(self, name):
+        flat = self.lookup(name)
+        distinct = [tuple(flat[low:high]) for low, high in self.bounds(name + "_offsets")]
+        return list(map(distinct.__getitem__, self.section(name + "_rows").tolist()))
+
+    def catalog(self, orders=None):
+        columns = {name: self.lookup(name) for name in _STRING_COLUMNS}
+        columns.update((name, self.tuples(name)) for name in _TUPLE_COLUMNS)
+        # Numeric columns are copied out (a memcpy each), as catalogs extend them
+        columns.update((name, _copy(self.section(name))) for name in _NUMERIC_COLUMNS)
+
+        origin_sources = self.section("origin_sources").tolist()
+        origin_uris = self.tuples("origin_uris")
+        origin_keys = self.lookup("origin_keys")
+        origins = {row: tuple(zip(origin_sources[low:high], origin_uris[low:high], origin_keys[low:high]))
+                   for row, (low, high) in zip(self.section("origin_rows").tolist(), self.bounds("origin_offsets"))}
+        return Catalog.restore(self.header["sources"], columns, origins, orders, self.section("retired").tolist())
+
+
+def load_snapshot(urls, hashes, index_column="name_keys", path=None):
+    """Return (catalog, index) saved for exactly these sources and bodies, or None.
+
+    The file is memory-mapped: posting lists stay in the mapping and are paged
+    in as searches touch them, everything else is read straight from it. index
+    is None when the snapshot holds none over index_column.
+    """
+    path = path or snapshot_path()
+    try:
+        view, start, header = _open(path)
+    except (OSError, ValueError) as e:
+        if os.path.exists(path):
+            print(f"Ignoring unreadable catalog snapshot: {e}")
+        return None
+    if header is None or header["urls"] != list(urls) or header["hashes"] != list(hashes):
+        return None
+    if header["byteorder"] != sys.byteorder or any(array(code).itemsize != size
+                                                   for code, size in header["itemsizes"].items()):
+        return None
+
+    reader = _Reader(view, start, header)
+    # Sort orders are copied out like the numeric columns
+    catalog = reader.catalog({field: _copy(reader.section("order_" + field)) for field in _SORTED_FIELDS})
+
+    index = None
+    if header["index"] == index_column:
+        grams = map(reader.strings.__getitem__, reader.section("grams").tolist())
+        postings = reader.section("postings")
+        index = SubstringIndex.from_postings(
+            getattr(catalog, index_column), catalog.tokens,
+            {gram: postings[low:high] for gram, (low, high) in zip(grams, reader.bounds("posting_offsets"))})
+    return catalog, index
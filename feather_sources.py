@@ -0,0 +1,537 @@
+import os
+import json
+import time
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import CancelledError, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import requests
+import feather_http
+from feather_cache import SourceCache, cache_dir, atomic_write
+from feather_catalog import Catalog, CatalogDelta
+from feather_snapshot import pack_catalog, unpack_catalog
+from feather_stream import iter_download_batches
+
+# Upper bound on simultaneous source downloads
+MAX_WORKERS = 8
+
+# Processes that parse and normalize large source bodies; with a single core parsing stays on threads
+PARSE_PROCESSES = min(os.cpu_count() or 1, MAX_WORKERS)
+# Bodies smaller than this are parsed as they stream in; a worker costs more than it saves on them
+PARSE_PROCESS_MIN_BYTES = 8 << 20
+
+# Bytes read from the network (or the cache file) per parser step
+CHUNK_SIZE = 1 << 16
+
+# Seconds a whole load may take before the catalog is shown with whatever arrived
+LOAD_DEADLINE = 30
+
+# Failures in a row after which a source is skipped for a while
+BREAKER_THRESHOLD = 3
+# First skip period in seconds; it doubles with every further failure, up to the maximum
+BREAKER_COOLDOWN = 10 * 60
+BREAKER_MAX_COOLDOWN = 24 * 3600
+
+# Share of a catalog's entries that may be retired before a refresh rebuilds it rather than patch it
+MAX_RETIRED_FRACTION = 0.25
+
+
+class FetchCancelled(Exception):
+    """Raised inside a fetch when the caller asked to stop."""
+
+
+class SourceResult:
+    """Outcome of fetching a single source from urls.txt."""
+
+    def __init__(self, url, catalog=None, error=None, from_cache=False, cancelled=False, skipped=False,
+                 sha256=None, unchanged=False, deferred=False):
+        self.url = url
+        # Compact entries of this source alone; merged into the full catalog by callers
+        self.catalog = catalog if catalog is not None else Catalog()
+        self.error = error
+        # True when the body came from the on-disk cache (304 Not Modified)
+        self.from_cache = from_cache
+        # Failed only because the caller stopped the load
+        self.cancelled = cancelled
+        # Not attempted at all because its circuit breaker is open
+        self.skipped = skipped
+        # Still loading at the deadline; it goes on in the background and lands in the cache
+        self.deferred = deferred
+        # Seconds the fetch took, when one was made
+        self.elapsed = None
+        # Hex SHA-256 of the body the entries were parsed from, when it is known
+        self.sha256 = sha256
+        # Still the cached body the caller already has the entries of; not parsed again, so catalog is empty
+        self.unchanged = unchanged
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class SourceHealth:
+    """Track record of every source across runs, with a circuit breaker.
+
+    Per URL it keeps the smoothed latency of successful loads, the current
+    streak of failures, and when the source last succeeded and failed. After
+    BREAKER_THRESHOLD failures in a row a source is skipped until a cooldown
+    has passed (doubling with each further failure); then a single attempt
+    decides whether it is back.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(cache_dir("sources"), "health.json")
+        self.records = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                records = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        return records if isinstance(records, dict) else {}
+
+    def failures(self, url):
+        return self.records.get(url, {}).get("failures", 0)
+
+    def cooldown(self, url):
+        """Seconds until url may be tried again; 0 when its breaker is closed."""
+        failures = self.failures(url)
+        if failures < BREAKER_THRESHOLD:
+            return 0
+        period = min(BREAKER_COOLDOWN * 2 ** (failures - BREAKER_THRESHOLD), BREAKER_MAX_COOLDOWN)
+        return max(0, self.records[url].get("last_failure", 0) + period - time.time())
+
+    def order(self, urls):
+        """Positions of urls, reliable and fast sources first."""
+        def rank(position):
+            record = self.records.get(urls[position], {})
+            return (record.get("failures", 0), record.get("latency", 0))
+        return sorted(range(len(urls)), key=rank)
+
+    def record_success(self, url, latency):
+        record = self.records.setdefault(url, {})
+        if latency is not None:
+            previous = record.get("latency")
+            record["latency"] = latency if previous is None else 0.7 * previous + 0.3 * latency
+        record["failures"] = 0
+        record["last_success"] = time.time()
+
+    def record_failure(self, url, error):
+        record = self.records.setdefault(url, {})
+        record["failures"] = record.get("failures", 0) + 1
+        record["last_failure"] = time.time()
+        record["last_error"] = error
+
+    def save(self):
+        try:
+            atomic_write(self.path, json.dumps(self.records).encode("utf-8"))
+        except OSError as e:
+            print(f"Could not save source health: {e}")
+
+
+def read_urls(urls_file="urls.txt"):
+    """Read the source list, skipping blank lines. Raises FileNotFoundError."""
+    with open(urls_file, 'r') as file:
+        return [line.strip() for line in file.readlines() if line.strip()]
+
+
+def collect_entries(url, chunks, on_entries=None):
+    """Parse a source body chunk by chunk into a Catalog, passing the size of each batch to on_entries."""
+    catalog = Catalog()
+    source_id = catalog.source_id(url)
+    for batch in iter_download_batches(chunks):
+        for entry in batch:
+            catalog.add(entry, source_id)
+        if on_entries:
+            on_entries(url, len(batch))
+    return catalog
+
+
+def parse_cached_source(url, directory):
+    """Parse a cached source body in a worker process, reading it from disk chunk by chunk; returns the packed Catalog.
+
+    Packed columns pickle as a single bytes object, far cheaper to send back
+    than the entries themselves.
+    """
+    return pack_catalog(collect_entries(url, SourceCache(directory).iter_chunks(url, CHUNK_SIZE)))
+
+
+class _ParsePool:
+    """Worker processes for large cached bodies, started when the first one needs parsing."""
+
+    def __init__(self, processes):
+        self.processes = processes
+        self.lock = threading.Lock()
+        self.executor = None
+        self.closed = False
+
+    def parse(self, url, directory):
+        """The Catalog of url's cached body, parsed in a worker, or None when no worker could."""
+        with self.lock:
+            if self.executor is None and not self.closed:
+                # Spawned rather than forked: the GUIs fork with Qt and download threads running
+                try:
+                    context = multiprocessing.get_context("spawn")
+                    self.executor = ProcessPoolExecutor(self.processes, mp_context=context)
+                except (OSError, NotImplementedError) as e:
+                    print(f"Parsing sources without worker processes: {e}")
+                    self.closed = True
+            executor = self.executor
+        if executor is None:
+            return None
+        try:
+            return unpack_catalog(executor.submit(parse_cached_source, url, directory).result())
+        except (BrokenProcessPool, CancelledError, RuntimeError):
+            # A worker died (e.g. out of memory) or the pool was shut down
+            return None
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor, self.closed = self.executor, None, True
+        if executor is not None:
+            # A parse that has not started is dropped; its caller parses on its own thread
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _parse_cached(url, cache, on_entries=None, on_bytes=None, cancel=None, pool=None):
+    """Parse the cached body of url, in a worker process when there is a pool and the body is large."""
+    if pool is not None and (cache.body_size(url) or 0) >= PARSE_PROCESS_MIN_BYTES:
+        catalog = pool.parse(url, cache.directory)
+        if catalog is not None:
+            if on_entries:
+                on_entries(url, len(catalog))
+            return catalog
+    chunks = _watch(cache.iter_chunks(url, CHUNK_SIZE), url, on_bytes=on_bytes, cancel=cancel)
+    return collect_entries(url, chunks, on_entries)
+
+
+def _length(response):
+    try:
+        return int(response.headers.get("Content-Length") or 0)
+    except ValueError:
+        return 0
+
+
+def _watch(chunks, url, writer=None, on_bytes=None, cancel=None):
+    """Pass chunks through, copying them to the cache and checking for cancellation."""
+    for chunk in chunks:
+        if cancel is not None and cancel.is_set():
+            raise FetchCancelled()
+        if writer:
+            writer.write(chunk)
+        if on_bytes:
+            on_bytes(url, len(chunk))
+        yield chunk
+
+
+def fetch_source(url, timeout=None, cache=None, on_entries=None, on_bytes=None, cancel=None, pool=None,
+                 known=None):
+    """Download one source and return a SourceResult with its entries.
+
+    The body is parsed while it streams in, so entries reach on_entries(url, count)
+    before the transfer finishes, and on_bytes(url, count) sees every chunk read
+    from the network or the cache. When a cache is given the request is
+    conditional, and a 304 reuses the stored body instead of downloading it
+    again. Setting the cancel threading.Event stops the fetch at the next chunk.
+    With a process pool (see fetch_all_sources()) a body announced as at least
+    PARSE_PROCESS_MIN_BYTES long is only downloaded into the cache here, then
+    parsed from there by a worker, and on_entries hears of its entries all at once.
+    known is the hash of the body whose entries the caller already has; a 304
+    for that same cached body returns an unchanged result without parsing it.
+    The result's elapsed holds how long it all took.
+    """
+    started = time.monotonic()
+    result = _fetch_source(url, timeout, cache, on_entries, on_bytes, cancel, pool, known)
+    result.elapsed = time.monotonic() - started
+    return result
+
+
+def _fetch_source(url, timeout, cache, on_entries, on_bytes, cancel, pool, known):
+    headers = cache.conditional_headers(url) if cache else {}
+    try:
+        if cancel is not None and cancel.is_set():
+            raise FetchCancelled()
+        response = feather_http.get(url, headers=headers, timeout=timeout, stream=True)
+        if response.status_code == 304 and cache:
+            response.close()
+            sha256 = cache.content_hash(url)
+            if known is not None and sha256 == known:
+                return SourceResult(url, from_cache=True, sha256=sha256, unchanged=True)
+            try:
+                catalog = _parse_cached(url, cache, on_entries, on_bytes, cancel, pool)
+                return SourceResult(url, catalog, from_cache=True, sha256=cache.content_hash(url))
+            except OSError:
+                # Cache entry vanished between the check and the read; fetch it in full
+                response = feather_http.get(url, timeout=timeout, stream=True)
+        with response:
+            if response.status_code != 200:
+                return SourceResult(url, error=f"Failed to fetch data from {url}. Status code: {response.status_code}")
+            writer = cache.writer(url, response.headers) if cache else None
+            in_worker = pool is not None and writer is not None and _length(response) >= PARSE_PROCESS_MIN_BYTES
+            try:
+                chunks = _watch(response.iter_content(CHUNK_SIZE), url, writer, on_bytes, cancel)
+                if in_worker:
+                    # Only downloaded here; a worker parses it from the cache once it is all in
+                    for _ in chunks:
+                        pass
+                else:
+                    catalog = collect_entries(url, chunks, on_entries)
+            except BaseException:
+                if writer:
+                    writer.discard()
+                raise
+            if writer and not writer.commit() and in_worker:
+                return SourceResult(url, error=f"Could not cache {url} to parse it")
+            if in_worker:
+                catalog = _parse_cached(url, cache, on_entries, pool=pool)
+            return SourceResult(url, catalog, sha256=writer.sha256.hexdigest() if writer else None)
+    except FetchCancelled:
+        return SourceResult(url, error=f"Cancelled loading {url}", cancelled=True)
+    except requests.exceptions.RequestException as e:
+        return SourceResult(url, error=f"Error fetching data from {url}: {e}")
+    except ValueError as e:
+        return SourceResult(url, error=f"Invalid JSON from {url}: {e}")
+
+
+def load_cached_source(url, cache, pool=None):
+    """Return the last stored copy of a source without touching the network.
+
+    With a process pool a body of at least PARSE_PROCESS_MIN_BYTES is parsed
+    by a worker that streams it from disk itself, so neither process holds it
+    whole.
+    """
+    try:
+        catalog = _parse_cached(url, cache, pool=pool)
+    except (OSError, ValueError):
+        return None
+    return SourceResult(url, catalog, from_cache=True, sha256=cache.content_hash(url))
+
+
+def load_cached_sources(urls, cache=None, processes=0):
+    """Return cached results for urls in order, or None if nothing is cached yet.
+
+    With more than one process the large bodies are parsed in up to that many
+    worker processes at once, while the small ones stream on threads.
+    """
+    if cache is None:
+        cache = SourceCache()
+    large = sum((cache.body_size(url) or 0) >= PARSE_PROCESS_MIN_BYTES for url in urls)
+    if processes > 1 and large and len(urls) > 1:
+        pool = _ParsePool(min(processes, large))
+        try:
+            with ThreadPoolExecutor(len(urls)) as readers:
+                results = list(readers.map(lambda url: load_cached_source(url, cache, pool), urls))
+        finally:
+            pool.shutdown()
+    else:
+        results = [load_cached_source(url, cache) for url in urls]
+    if not any(results):
+        return None
+    return [result for result in results if result]
+
+
+def fetch_all_sources(urls, timeout=None, max_workers=MAX_WORKERS, cache=None,
+                      on_entries=None, on_bytes=None, on_result=None, cancel=None,
+                      health=None, deadline=None, processes=0, known=None):
+    """Fetch every source in parallel and return the results in urls order.
+
+    on_entries and on_bytes are called from the worker threads as data arrives.
+    Bodies are parsed as they stream in. With more than one process, large
+    ones are instead downloaded into the cache and parsed from there in up to
+    that many worker processes, started when the first large body arrives,
+    so a cold start is not limited to the one core the threads share (see
+    fetch_source()). known maps URLs to the
+    hash of the body the caller has the entries of, see fetch_source().
+    on_result(position, result) is called from the calling thread as each
+    source completes, in completion order.
+
+    With a SourceHealth, sources whose breaker is open are skipped, the rest
+    start in order of reliability, and every outcome is recorded. After
+    deadline seconds the call returns with deferred results for the sources
+    still loading. Their downloads go on in the background into the cache,
+    for the next load to use, without calling on_entries or on_bytes any
+    more, and their outcome is recorded in health once they finish.
+    """
+    if not urls:
+        return []
+    if cache is None:
+        cache = SourceCache()
+    results = [None] * len(urls)
+    positions = range(len(urls)) if health is None else health.order(urls)
+    # Set once the call has returned; what finishes after that only goes to the cache and health
+    returned = threading.Event()
+    lock = threading.Lock()
+
+    def while_waited(callback):
+        if callback is None:
+            return None
+        return lambda *args: None if returned.is_set() else callback(*args)
+
+    on_entries, on_bytes = while_waited(on_entries), while_waited(on_bytes)
+    pending = queue.Queue()
+    for position in positions:
+        url = urls[position]
+        if health is not None and health.cooldown(url):
+            minutes = int(health.cooldown(url) // 60) + 1
+            error = f"Skipped {url}: failed {health.failures(url)} times in a row, retrying in {minutes} min"
+            results[position] = SourceResult(url, error=error, skipped=True)
+            if on_result:
+                on_result(position, results[position])
+            continue
+        pending.put((position, url))
+
+    # Daemon threads rather than an executor: past the deadline they carry on
+    # without the caller, and not even interpreter exit waits for them
+    finished = queue.Queue()
+    remaining = pending.qsize()
+
+    def work():
+        while True:
+            try:
+                position, url = pending.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                result = fetch_source(url, timeout, cache, on_entries, on_bytes, cancel, pool,
+                                      None if known is None else known.get(url))
+            except Exception as e:
+                result = SourceResult(url, error=f"Error fetching data from {url}: {e}")
+            with lock:
+                if not returned.is_set():
+                    finished.put((position, result))
+                    continue
+                if health is not None and not result.cancelled:
+                    _record(health, result)
+                    health.save()
+
+    pool = _ParsePool(min(processes, remaining)) if processes > 1 and remaining > 1 else None
+    for _ in range(max(1, min(max_workers, remaining))):
+        threading.Thread(target=work, daemon=True).start()
+    end = None if deadline is None else time.monotonic() + deadline
+    try:
+        while remaining:
+            try:
+                position, result = finished.get(timeout=None if end is None else max(0, end - time.monotonic()))
+            except queue.Empty:
+                break
+            results[position] = result
+            remaining -= 1
+            if on_result:
+                on_result(position, result)
+    finally:
+        with lock:
+            returned.set()
+        if pool is not None:
+            pool.shutdown()
+    # Results put in just before the deadline still count
+    while not finished.empty():
+        position, result = finished.get()
+        results[position] = result
+        if on_result:
+            on_result(position, result)
+    if health is not None:
+        with lock:
+            for result in results:
+                if result is not None and not result.skipped and not result.cancelled:
+                    _record(health, result)
+            health.save()
+    for position, result in enumerate(results):
+        if result is None:
+            url = urls[position]
+            error = f"Still loading {url} after {deadline}s; it will be used once it is in the cache"
+            results[position] = SourceResult(url, error=error, deferred=True)
+            if on_result:
+                on_result(position, results[position])
+    return results
+
+
+def _record(health, result):
+    if result.ok:
+        health.record_success(result.url, result.elapsed)
+    else:
+        health.record_failure(result.url, result.error)
+
+
+def fall_back_to_cache(results, cache):
+    """Replace every failed result with the source's last cached copy, or None if there is none.
+
+    Unchanged results, whose entries were not parsed, are read from the cache too.
+    """
+    return [result if result.ok and not result.unchanged else load_cached_source(result.url, cache)
+            for result in results]
+
+
+def failure_summary(results):
+    """One message listing every source that failed, or None if all of them loaded."""
+    failed = [result for result in results if not result.ok and not result.cancelled]
+    if not failed:
+        return None
+    lines = [f"Could not load {len(failed)} of {len(results)} sources:"]
+    lines += [f"  {result.error}" for result in failed]
+    return "\n".join(lines)
+
+
+def merge_results(results):
+    """Combine per-source results into one Catalog, in the order given.
+
+    A release listed by several sources becomes a single entry; see
+    Catalog.deduplicate().
+    """
+    catalog = Catalog()
+    for result in results:
+        if result:
+            catalog.merge(result.catalog)
+    return catalog.deduplicate()
+
+
+def refresh_changes(catalog, hashes, results, cache):
+    """Changes that bring catalog up to date with a refresh, and the hashes of the bodies behind it then.
+
+    hashes maps every URL, in urls order, to the hash of the body catalog was
+    built from; pass it as fetch_all_sources()'s known. Only sources whose
+    body changed are compared, entry by entry (see Catalog.diff_source()),
+    so this costs in proportion to what changed. A failed source keeps its
+    last cached copy, as in a full load. Returns (delta, hashes); delta is
+    None when catalog has to be rebuilt from the results instead: the source
+    list changed, a merged release changed, or too many entries are retired.
+    """
+    current = {}
+    changed = []
+    for result in results:
+        url = result.url
+        current[url] = result.sha256 if result.ok else cache.content_hash(url)
+        if current[url] is None or current[url] != hashes.get(url):
+            changed.append(result)
+    if list(current) != list(hashes):
+        return None, current
+
+    delta = CatalogDelta()
+    for result in changed:
+        if not result.ok:
+            result = load_cached_source(result.url, cache) or SourceResult(result.url)
+        if not catalog.diff_source(result.url, result.catalog, delta):
+            return None, current
+    if not delta:
+        return delta, current
+    if len(catalog.retired) + len(delta.retired) > MAX_RETIRED_FRACTION * len(catalog) or catalog.merges_with(delta):
+        return None, current
+    return delta, current
+
+
+def load_catalog(urls, timeout=None, on_error=print, deadline=LOAD_DEADLINE):
+    """Fetch all sources concurrently and merge their entries in urls order.
+
+    Sources that fail, are skipped by their breaker or are still loading at the
+    deadline contribute their last cached copy, and on_error receives a single
+    summary of the failures.
+    """
+    cache = SourceCache()
+    health = SourceHealth()
+    results = fetch_all_sources(urls, timeout, cache=cache, health=health, deadline=deadline,
+                                processes=PARSE_PROCESSES)
+    summary = failure_summary(results)
+    if summary and on_error:
+        on_error(summary)
+    return merge_results(fall_back_to_cache(results, cache))
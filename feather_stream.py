@@ -0,0 +1,148 @@
+import json
+import codecs
+
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",:]}"
+
+# Drop consumed text from the front of the buffer once it grows past this
+_COMPACT_AT = 1 << 16
+
+
+class DownloadsStreamParser:
+    """Incrementally pulls entries out of a source's top-level "downloads" array.
+
+    Feed it text as it arrives; every call returns the entries that became
+    complete. Only the entry currently being read is kept in memory, never the
+    whole document. Other top-level keys are parsed and discarded.
+    """
+
+    def __init__(self):
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.state = "start"
+        self.key = None
+
+    def feed(self, text, final=False):
+        """Add text and return the list of entries completed by it."""
+        if text:
+            self.buffer += text
+        entries = []
+        while self._step(entries, final):
+            pass
+        if self.pos > _COMPACT_AT:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        return entries
+
+    def close(self):
+        """Finish the stream, returning any last entries. Raises ValueError if truncated."""
+        entries = self.feed("", final=True)
+        if self.state != "done":
+            raise ValueError("Unexpected end of source data")
+        if self.buffer[self.pos:].strip(_WHITESPACE):
+            raise ValueError("Extra data after the end of the source")
+        return entries
+
+    def _skip_whitespace(self):
+        buffer = self.buffer
+        pos = self.pos
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        self.pos = pos
+        return buffer[pos] if pos < len(buffer) else None
+
+    def _decode(self, final):
+        """Decode one JSON value at the cursor, or return (False, None) if it is not complete yet."""
+        try:
+            value, end = self.decoder.raw_decode(self.buffer, self.pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return False, None
+        # A number or literal is only known to be complete once a delimiter follows it
+        if not final and (end == len(self.buffer) or self.buffer[end] not in _DELIMITERS):
+            return False, None
+        self.pos = end
+        return True, value
+
+    def _step(self, entries, final):
+        """Advance the state machine by one token; False means more input is needed."""
+        char = self._skip_whitespace()
+        if self.state == "done" or char is None:
+            return False
+
+        if self.state == "start":
+            if char != "{":
+                raise ValueError("Source data is not a JSON object")
+            self.pos += 1
+            self.state = "first_key"
+        elif self.state in ("first_key", "key"):
+            if char == "}" and self.state == "first_key":
+                self.pos += 1
+                self.state = "done"
+                return True
+            if char != '"':
+                raise ValueError(f"Expected a key at offset {self.pos}")
+            complete, self.key = self._decode(final)
+            if not complete:
+                return False
+            self.state = "colon"
+        elif self.state == "colon":
+            if char != ":":
+                raise ValueError(f"Expected ':' at offset {self.pos}")
+            self.pos += 1
+            self.state = "array_start" if self.key == "downloads" else "value"
+        elif self.state == "array_start":
+            if char != "[":
+                # Not a list; skip it like any other value
+                self.state = "value"
+                return True
+            self.pos += 1
+            self.state = "first_item"
+        elif self.state in ("first_item", "item"):
+            if char == "]" and self.state == "first_item":
+                self.pos += 1
+                self.state = "after_value"
+                return True
+            complete, entry = self._decode(final)
+            if not complete:
+                return False
+            entries.append(entry)
+            self.state = "item_separator"
+        elif self.state == "item_separator":
+            self.pos += 1
+            if char == ",":
+                self.state = "item"
+            elif char == "]":
+                self.state = "after_value"
+            else:
+                raise ValueError(f"Expected ',' or ']' at offset {self.pos - 1}")
+        elif self.state == "value":
+            complete, _ = self._decode(final)
+            if not complete:
+                return False
+            self.state = "after_value"
+        elif self.state == "after_value":
+            self.pos += 1
+            if char == ",":
+                self.state = "key"
+            elif char == "}":
+                self.state = "done"
+            else:
+                raise ValueError(f"Expected ',' or '}}' at offset {self.pos - 1}")
+        return True
+
+
+def iter_download_batches(chunks):
+    """Yield lists of download entries from an iterable of raw byte chunks."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    parser = DownloadsStreamParser()
+    for chunk in chunks:
+        entries = parser.feed(decoder.decode(chunk))
+        if entries:
+            yield entries
+    entries = parser.feed(decoder.decode(b"", final=True))
+    entries.extend(parser.close())
+    if entries:
+        yield entries
@@ -0,0 +1,107 @@
+import random
+import pytest
+from feather_catalog import Catalog, CatalogDelta
+
+FITGIRL = "https://example.com/fitgirl.json"
+DODI = "https://example.com/dodi.json"
+GOG = "https://example.com/gog.json"
+
+
+def entry(title, digest=None, size="5 GB"):
+    uris = [f"magnet:?xt=urn:btih:{digest * 40}"] if digest else []
+    return {"title": title, "uris": uris, "fileSize": size}
+
+
+def build(sources):
+    """What a full load makes of {url: entries}."""
+    catalog = Catalog()
+    for url, entries in sources.items():
+        catalog.extend(url, entries)
+    return catalog.deduplicate()
+
+
+def listing(catalog):
+    """The live entries with their sources, comparable whatever indices and order they have."""
+    return sorted((catalog.titles[index], catalog.sizes[index], catalog.dates[index],
+                   tuple(sorted(catalog.uris[index])),
+                   tuple(sorted(catalog.sources[source_id] for source_id in catalog.entry_sources(index))))
+                  for index in catalog.live())
+
+
+def refresh(old, new):
+    """Patch a catalog of the sources old to new; returns it, or None when a rebuild is needed."""
+    catalog = build(old)
+    delta = CatalogDelta()
+    for url, entries in new.items():
+        if entries != old.get(url):
+            fresh = Catalog()
+            fresh.extend(url, entries)
+            if not catalog.diff_source(url, fresh, delta):
+                return None
+    if catalog.merges_with(delta):
+        return None
+    catalog.apply(delta)
+    return catalog
+
+
+SOURCES = {FITGIRL: [entry("Hades [FitGirl Repack]", "a")], DODI: [entry("Hades", "a", "6 GB")],
+           GOG: [entry("Celeste", "c")]}
+
+
+@pytest.mark.parametrize("new, patched", [
+    # Only the second member of the merged Hades had this title
+    pytest.param({**SOURCES, GOG: [entry("Celeste", "c"), entry("Hades", "b")]}, False,
+                 id="merged member's title listed again"),
+    pytest.param({**SOURCES, GOG: [entry("Celeste", "c"), entry("Tunic", "d")]}, True, id="new release"),
+    pytest.param({**SOURCES, GOG: [entry("Celeste", "c", "1 GB")]}, True, id="size changed"),
+    pytest.param({**SOURCES, GOG: []}, True, id="release gone"),
+    pytest.param({**SOURCES, DODI: []}, False, id="merged member gone"),
+    pytest.param({**SOURCES, DODI: [entry("Hades II", "a")]}, False, id="merged member renamed"),
+])
+def test_refresh(new, patched):
+    catalog = refresh(SOURCES, new)
+    assert (catalog is not None) == patched
+    if catalog is not None:
+        assert listing(catalog) == listing(build(new))
+
+
+def random_title(rng):
+    return f"Game {rng.randrange(20)}"
+
+
+def random_entry(rng):
+    # Few enough titles and hashes that releases keep merging across sources
+    digest = rng.choice("0123456789abcdef") if rng.random() < 0.7 else None
+    return entry(random_title(rng), digest, rng.choice(("1 GB", "2 GB", "3 GB")))
+
+
+def mutate(rng, entries):
+    entries = list(entries)
+    for _ in range(rng.randint(1, 3)):
+        change = rng.randrange(4)
+        if change == 0 or not entries:
+            entries.insert(rng.randint(0, len(entries)), random_entry(rng))
+        elif change == 1:
+            del entries[rng.randrange(len(entries))]
+        elif change == 2:
+            position = rng.randrange(len(entries))
+            entries[position] = dict(entries[position], fileSize=rng.choice(("1 GB", "4 GB")))
+        else:
+            position = rng.randrange(len(entries))
+            entries[position] = dict(entries[position], title=random_title(rng))
+    return entries
+
+
+def test_patched_catalog_matches_rebuild():
+    rng = random.Random(25)
+    urls = [FITGIRL, DODI, GOG]
+    patched = 0
+    for _ in range(3000):
+        old = {url: [random_entry(rng) for _ in range(rng.randint(0, 5))] for url in urls}
+        new = {url: mutate(rng, entries) if rng.random() < 0.5 else entries for url, entries in old.items()}
+        catalog = refresh(old, new)
+        if catalog is not None:
+            patched += 1
+            assert listing(catalog) == listing(build(new)), (old, new)
+    # Most changes should be patched, or the comparison above proves little
+    assert patched > 1000
@@ -0,0 +1,17 @@
+import pytest
+from feather_catalog import parse_size
+
+
+@pytest.mark.parametrize("text, size", [
+    ("60 GB", 60 << 30),
+    ("1.5GB", 3 << 29),
+    ("700 MiB", 700 << 20),
+    ("1,5 GB", 3 << 29),
+    ("1,024 MB", 1 << 30),
+    ("12,345,678 bytes", 12345678),
+    ("1,024.5 MB", int(1024.5 * (1 << 20))),
+    ("9" * 30 + " TB", None),
+    ("huge", None),
+])
+def test_parse_size(text, size):
+    assert parse_size(text) == size